@@ -1,41 +1,139 @@
 import plotly.graph_objects as go
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output, State
+from dash.dependencies import ALL, Input, Output, State
 import numpy as np
-from chaos_game import chaos_game_triangle
-from critexp import solve_for_d
-import urllib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from plotly.subplots import make_subplots
+from cache import make_cache
+from chaos_game import chaos_game_ifs, chaos_game_triangle, iter_chaos_game_triangle, result_cache
+from critexp import similarity_dimension, solve_for_d
+from fracdim import BoxCounter, DimensionEstimate
+from ifs import CHUNK_SIZE, iter_chaos_game, sierpinski_simplex
+from render import (EXTENT, EXTENT3, PRECISIONS, counts_figure, density_figure, density_trace, encode_axis,
+                    histogram, scale_counts, volume_figure, voxel_counts)
+from zoom import tile_cache, zoom_figure
+import urllib.parse
 from dash import dash_table
 from dash.exceptions import PreventUpdate
 
-app = dash.Dash(__name__)
+# Bump to invalidate cached responses, figures and panels (see response_key)
+# after changing how figures are built.
+RESPONSE_VERSION = 1
+
+# Seconds a response cached by the background job manager stays valid.
+RESPONSE_TTL = int(os.environ.get('CHAOS_RESPONSE_TTL', 24 * 3600))
+
+# Runs of at least STREAM_LIMIT points are computed by background jobs that
+# stream partial results when dash[diskcache] (diskcache, multiprocess and
+# psutil) is installed; CHAOS_BACKGROUND=0 turns this off.  Smaller runs are
+# answered synchronously by the web process.
+background_manager = None
+if os.environ.get('CHAOS_BACKGROUND', '1') != '0':
+    try:
+        import diskcache
+        background_manager = dash.DiskcacheManager(
+            diskcache.Cache(os.environ.get('CHAOS_JOB_CACHE', './.cache/jobs')),
+            cache_by=[lambda: RESPONSE_VERSION], expire=RESPONSE_TTL)
+    except ImportError:
+        pass
+
+# Background jobs run in child processes, so the caches they fill must be
+# shared with the web process: with background jobs on, the response,
+# figure and panel caches default to the sqlite backend.
+SHARED_BACKEND = os.environ.get('CHAOS_CACHE_BACKEND') or (
+    'sqlite' if background_manager is not None else 'memory')
+
+app = dash.Dash(__name__, background_callback_manager=background_manager)
 server = app.server
 
+# Above this many points 'auto' rendering sends a density image, not markers.
+SCATTER_LIMIT = 50000
+
+# Background runs of at least this many points report partial results.
+STREAM_LIMIT = 1000000
+
+# Figures and comparison panels of at least PARALLEL_POINTS points are
+# generated by CHAOS_WORKERS processes (default 1, i.e. in process).
+WORKERS = int(os.environ.get('CHAOS_WORKERS', 1))
+PARALLEL_POINTS = int(os.environ.get('CHAOS_PARALLEL_POINTS', 500000))
+
+# Bookmarks compared at once, each computed on its own thread, and the
+# pixels along each side of their (downsampled) density images.
+COMPARE_WORKERS = int(os.environ.get('CHAOS_COMPARE_WORKERS', 4))
+COMPARE_BINS = 200
+
+# Runs without a seed in the URL use this one, so equal inputs give equal
+# (and cacheable) responses.
+DEFAULT_SEED = 0
+
+# Values the render and shape inputs (and URL parameters) may take.
+RENDER_MODES = ('auto', 'scatter', 'density')
+SHAPES = ('triangle', 'pyramid')
+
+# Parameters of the landing page, matching the initial input values.
+DEFAULT_PARAMS = {
+    'num_points': 10000,
+    'p1': 0.33, 'p2': 0.33,
+    'r1': 1/2, 'r2': 1/2, 'r3': 1/2,
+    'render': 'auto',
+    'precision': 'float32',
+    'shape': 'triangle'
+}
+
+# Finished callback outputs (figure as a plain dict, diagnostic text,
+# parameter label, params), keyed by response_key.
+response_cache = make_cache('responses', backend=SHARED_BACKEND, max_bytes=64 * 2**20)
+
+# Figures (as plain dicts) and dimension estimates of seeded runs, keyed by
+# response_key; shared with comparison views and bookmarks.
+figure_cache = make_cache('figures', backend=SHARED_BACKEND, max_bytes=128 * 2**20)
+
+# Comparison panels (density levels, dimension estimate) of seeded runs,
+# keyed by response_key.
+panel_cache = make_cache('panels', backend=SHARED_BACKEND, max_bytes=32 * 2**20)
+compare_pool = ThreadPoolExecutor(max_workers=COMPARE_WORKERS, thread_name_prefix='compare')
+
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),  # Add URL component at the top
     html.Div([
         html.H1("Chaos Game Triangle",style={'textAlign': 'center'}),
         # Add the input components
-        dcc.Input(id='num-points-input', type='number', value=10000, placeholder="Number of points"),
-        dcc.Input(id='p1-input', type='number', value=0.33, step=0.01, placeholder="p1"),
-        dcc.Input(id='p2-input', type='number', value=0.33, step=0.01, placeholder="p2"),
-        dcc.Input(id='r1-input', type='number', value=1/2, step=0.01, placeholder="r1"),
-        dcc.Input(id='r2-input', type='number', value=1/2, step=0.01, placeholder="r2"),
-        dcc.Input(id='r3-input', type='number', value=1/2, step=0.01, placeholder="r3"),
+        dcc.Input(id='num-points-input', type='number', value=DEFAULT_PARAMS['num_points'], placeholder="Number of points"),
+        dcc.Input(id='p1-input', type='number', value=DEFAULT_PARAMS['p1'], step=0.01, placeholder="p1"),
+        dcc.Input(id='p2-input', type='number', value=DEFAULT_PARAMS['p2'], step=0.01, placeholder="p2"),
+        dcc.Input(id='r1-input', type='number', value=DEFAULT_PARAMS['r1'], step=0.01, placeholder="r1"),
+        dcc.Input(id='r2-input', type='number', value=DEFAULT_PARAMS['r2'], step=0.01, placeholder="r2"),
+        dcc.Input(id='r3-input', type='number', value=DEFAULT_PARAMS['r3'], step=0.01, placeholder="r3"),
+        dcc.RadioItems(id='shape',
+                       options=[{'label': 'Triangle', 'value': 'triangle'},
+                                {'label': 'Pyramid (3D)', 'value': 'pyramid'}],
+                       value=DEFAULT_PARAMS['shape'], inline=True),
+        dcc.RadioItems(id='render-mode',
+                       options=[{'label': 'Auto', 'value': 'auto'},
+                                {'label': 'Points', 'value': 'scatter'},
+                                {'label': 'Density', 'value': 'density'}],
+                       value=DEFAULT_PARAMS['render'], inline=True),
         # Add the update button
         html.Button('Update', id='update-button', n_clicks=0),
         html.Button('Open in New Tab', id='new-tab-button', n_clicks=0),
         # Add a label for the current parameter set
         html.Div(id='parameter-label'),
+        html.Progress(id='progress-bar', value='0', max='100',
+                      style={'width': '100%', 'visibility': 'hidden'}),
         dcc.Graph(id='point-cloud-animation',style={
                     'height': 'calc(100vh - 200px)',  # Responsive height
                     'minHeight': '400px'              # Minimum height
                 }),
         html.Div(id='diagnostic-output', style={'whiteSpace': 'pre-line'}),
         dcc.Store(id='current-params'),
+        # Parameters of a long run handed to the background job
+        dcc.Store(id='stream-request'),
         # Store for bookmarked states
         dcc.Store(id='bookmarked-states', data=[]),
+        # Indices of the bookmarks shown in the comparison view
+        dcc.Store(id='compare-selection', data=[]),
         html.Div(id='new-tab-dummy', style={'display': 'none'})
         ],
         style={
@@ -48,21 +146,46 @@ app.layout = html.Div([
         'minHeight': '100vh'
         })
 
-@app.callback(
-    Output('point-cloud-animation', 'figure'),
-    Output('diagnostic-output', 'children'),
-    Output('parameter-label', 'children'),
-    Output('current-params', 'data'), 
-    Input('update-button', 'n_clicks'),
-    Input('url', 'search'),  # Get URL query string
-    State('num-points-input', 'value'),
-    State('p1-input', 'value'),
-    State('p2-input', 'value'),
-    State('r1-input', 'value'),
-    State('r2-input', 'value'),
-    State('r3-input', 'value')
-)
-def update_figure(n_clicks, url_search,num_points, p1, p2, r1, r2, r3):
+def update_figure(n_clicks, url_search,num_points, p1, p2, r1, r2, r3, render_mode, shape,
+                  set_progress=None):
+    params = request_params(url_search, num_points, p1, p2, r1, r2, r3, render_mode, shape)
+    return cached_response(params, set_progress)
+
+
+def cached_response(params, set_progress=None):
+    """The response to params from response_cache, computing and caching it if missing."""
+    key = response_key(params)
+    response = response_cache.get(key)
+    if response is None:
+        response = build_response(params, set_progress)
+        response_cache.set(key, response)
+    return response
+
+
+def streams(params):
+    """Whether params are long enough to be computed by a streaming background job."""
+    return (background_manager is not None and params['num_points'] >= STREAM_LIMIT
+            and params['render'] != 'scatter')
+
+
+def dispatch_figure(n_clicks, url_search, num_points, p1, p2, r1, r2, r3, render_mode, shape,
+                    stream_request):
+    """Answer from the cache or synchronously, handing long uncached runs to the background job."""
+    params = request_params(url_search, num_points, p1, p2, r1, r2, r3, render_mode, shape)
+    # Clearing the stream request cancels a job still running for an
+    # earlier request, which would otherwise overwrite this response.
+    cleared = None if stream_request is not None else dash.no_update
+    if streams(params):
+        response = response_cache.get(response_key(params))
+        if response is None:
+            return (dash.no_update, f"Computing {int(params['num_points']):,} points...",
+                    dash.no_update, dash.no_update, params)
+        return tuple(response) + (cleared,)
+    return tuple(cached_response(params)) + (cleared,)
+
+
+def request_params(url_search, num_points, p1, p2, r1, r2, r3, render_mode, shape):
+    """Run parameters from the URL query, falling back to the input values."""
     if url_search:
         from urllib.parse import parse_qs
         params = parse_qs(url_search.replace('?', ''))
@@ -73,15 +196,65 @@ def update_figure(n_clicks, url_search,num_points, p1, p2, r1, r2, r3):
         r1 = float(params.get('r1', [r1])[0])
         r2 = float(params.get('r2', [r2])[0])
         r3 = float(params.get('r3', [r3])[0])
-    params = {
+        seed = params.get('seed', [None])[0]
+        render_mode = params.get('render', [render_mode])[0]
+        precision = params.get('precision', ['float32'])[0]
+        shape = params.get('shape', [shape])[0]
+    else:
+        seed = None
+        precision = 'float32'
+    # Malformed values in a hand-edited link fall back to the defaults.
+    if precision not in PRECISIONS:
+        precision = DEFAULT_PARAMS['precision']
+    if render_mode not in RENDER_MODES:
+        render_mode = DEFAULT_PARAMS['render']
+    if shape not in SHAPES:
+        shape = DEFAULT_PARAMS['shape']
+    # A seed is recorded with every run so that shared links and bookmarks
+    # reproduce (and are cached as) exactly the same points.
+    seed = int(seed) if seed is not None and seed.isdigit() else DEFAULT_SEED
+    if shape == 'pyramid':
+        # The pyramid's four maps all have ratio r1 and weight 1/4; the other
+        # inputs do not apply and are fixed so equal pyramids share a key.
+        p1 = p2 = 1/4
+        r2 = r3 = r1
+    return {
         'num_points': num_points,
         'p1': p1, 'p2': p2,
-        'r1': r1, 'r2': r2, 'r3': r3
+        'r1': r1, 'r2': r2, 'r3': r3,
+        'seed': seed,
+        'render': render_mode,
+        'precision': precision,
+        'shape': shape
     }
-    
-    fig, fd = generate_figure(params)
-    fractal_dimension = solve_for_d(r1, r2, r3)
-    diagnostic_text = f"Box dimension estimate {fd:.4f}"
+
+
+def response_key(params):
+    """Cache key of the response to params, insensitive to int/float spelling.
+
+    Keys start with RESPONSE_VERSION, so bumping it invalidates the
+    response, figure and panel caches, persistent ones included.
+    """
+    return (RESPONSE_VERSION, int(params['num_points'])) + tuple(
+        float(params[k]) for k in ('p1', 'p2', 'r1', 'r2', 'r3')) + (
+        params.get('seed'), params.get('render', 'auto'),
+        params.get('precision', 'float32'), params.get('shape', 'triangle'))
+
+
+def build_response(params, set_progress=None):
+    """Compute the figure, diagnostic text and parameter label for params."""
+    num_points = params['num_points']
+    r1, r2, r3 = (params[k] for k in ('r1', 'r2', 'r3'))
+    render_mode, shape = params['render'], params['shape']
+    if set_progress is not None and num_points >= STREAM_LIMIT and render_mode != 'scatter':
+        fig, fd = stream_figure(params, set_progress)
+    else:
+        fig, fd = generate_figure(params)
+    if shape == 'pyramid':
+        fractal_dimension = float(similarity_dimension([r1] * 4))
+    else:
+        fractal_dimension = solve_for_d(r1, r2, r3)
+    diagnostic_text = describe_dimension(fd)
     
 
     # Then modify the parameter label creation in your update_figure callback:
@@ -93,14 +266,7 @@ def update_figure(n_clicks, url_search,num_points, p1, p2, r1, r2, r3):
             {'name': 'Parameter', 'id': 'param'},
             {'name': 'Value', 'id': 'value'}
         ],
-        data=[
-            {'param': 'N points', 'value': f"{num_points}"},
-            {'param': 'p₁', 'value': f"{p1:.3f}"},
-            {'param': 'p₂', 'value': f"{p2:.3f}"},
-            {'param': 'r₁', 'value': f"{r1:.3f}"},
-            {'param': 'r₂', 'value': f"{r2:.3f}"},
-            {'param': 'r₃', 'value': f"{r3:.3f}"}
-        ],
+        data=parameter_rows(params),
         style_table={'width': '300px'},
         style_cell={
             'textAlign': 'center',
@@ -119,8 +285,171 @@ def update_figure(n_clicks, url_search,num_points, p1, p2, r1, r2, r3):
         ], style={'marginTop': '10px'})
     ])
         
+    # The figure is kept as a plain dict, which is what the browser receives.
+    if not isinstance(fig, dict):
+        fig = fig.to_dict()
     return fig, diagnostic_text, param_label, params
 
+
+def parameter_rows(params):
+    """Rows of the parameter table: only the parameters the shape uses."""
+    rows = [{'param': 'N points', 'value': f"{params['num_points']}"}]
+    if params.get('shape') == 'pyramid':
+        return rows + [{'param': 'r (every map)', 'value': f"{params['r1']:.3f}"},
+                       {'param': 'p (every map)', 'value': f"{1/4:.3f}"}]
+    return rows + [{'param': name, 'value': f"{params[key]:.3f}"}
+                   for name, key in (('p₁', 'p1'), ('p₂', 'p2'),
+                                     ('r₁', 'r1'), ('r₂', 'r2'), ('r₃', 'r3'))]
+
+
+def parameter_text(params):
+    """One-line summary of the parameters the shape uses."""
+    if params.get('shape') == 'pyramid':
+        return f"pyramid, r={params['r1']:.2f}"
+    return (f"p=({params['p1']:.2f}, {params['p2']:.2f}), "
+            f"r=({params['r1']:.2f}, {params['r2']:.2f}, {params['r3']:.2f})")
+
+
+def prewarm(queries=None):
+    """Compute and cache the responses to the landing page and to extra URL queries.
+
+    queries default to the whitespace-separated query strings in
+    CHAOS_PREWARM, e.g. shared links or bookmarked states that should load
+    instantly.  Every run is computed here, long ones included, and lands in
+    response_cache, which dispatch_figure consults before starting a job.
+    """
+    if queries is None:
+        queries = os.environ.get('CHAOS_PREWARM', '').split()
+    inputs = [DEFAULT_PARAMS[k] for k in
+              ('num_points', 'p1', 'p2', 'r1', 'r2', 'r3', 'render', 'shape')]
+    for query in [''] + list(queries):
+        update_figure(0, query, *inputs)
+
+
+@server.route('/_cache-metrics')
+def cache_metrics():
+    """Hit and miss counts and sizes of the server's caches, as JSON.
+
+    Hits and misses are this process's; entries and bytes of the shared
+    backends cover every process.
+    """
+    metrics = {'response': response_cache.stats(),
+               'figures': figure_cache.stats(),
+               'panels': panel_cache.stats(),
+               'points': result_cache.stats(),
+               'tiles': tile_cache.stats()}
+    if background_manager is not None:
+        jobs = background_manager.handle
+        metrics['jobs'] = {'entries': len(jobs), 'bytes': jobs.volume()}
+    return metrics
+
+
+def describe_dimension(fd):
+    """Diagnostic line for a box-dimension estimate, with its interval when known."""
+    text = f"Box dimension estimate {fd:.4f}"
+    if isinstance(fd, DimensionEstimate) and np.isfinite(fd.low):
+        text += (f" (95% CI {fd.low:.4f} to {fd.high:.4f}; fitted on box sizes "
+                 f"{fd.fit_min:.2g} to {fd.fit_max:.2g})")
+    return text
+
+
+def stream_response(set_progress, params):
+    if params is None:
+        raise PreventUpdate
+    return cached_response(params, set_progress)
+
+
+UPDATE_FIGURE_DEPENDENCIES = [
+    Output('point-cloud-animation', 'figure'),
+    Output('diagnostic-output', 'children'),
+    Output('parameter-label', 'children'),
+    Output('current-params', 'data'),
+    Input('update-button', 'n_clicks'),
+    Input('url', 'search'),  # Get URL query string
+    State('num-points-input', 'value'),
+    State('p1-input', 'value'),
+    State('p2-input', 'value'),
+    State('r1-input', 'value'),
+    State('r2-input', 'value'),
+    State('r3-input', 'value'),
+    State('render-mode', 'value'),
+    State('shape', 'value')
+]
+
+if background_manager is not None:
+    app.callback(*UPDATE_FIGURE_DEPENDENCIES[:4], Output('stream-request', 'data'),
+                 *UPDATE_FIGURE_DEPENDENCIES[4:], State('stream-request', 'data'))(dispatch_figure)
+    # Every dispatch after a stream request changes it (to None when it
+    # answers itself), and Dash terminates the running job when its input
+    # changes, so an abandoned run neither pins a worker nor overwrites a
+    # newer view.
+    app.callback(
+        *(Output(o.component_id, o.component_property, allow_duplicate=True)
+          for o in UPDATE_FIGURE_DEPENDENCIES[:4]),
+        Input('stream-request', 'data'),
+        background=True,
+        prevent_initial_call=True,
+        progress=[Output('point-cloud-animation', 'figure', allow_duplicate=True),
+                  Output('diagnostic-output', 'children', allow_duplicate=True),
+                  Output('progress-bar', 'value')],
+        running=[(Output('progress-bar', 'style'),
+                  {'width': '100%', 'visibility': 'visible'},
+                  {'width': '100%', 'visibility': 'hidden'})]
+    )(stream_response)
+else:
+    app.callback(*UPDATE_FIGURE_DEPENDENCIES)(update_figure)
+
+
+def stream_figure(params, set_progress, updates=20):
+    """Build a density figure chunk by chunk, reporting partial results.
+
+    About `updates` times during the run set_progress receives the density
+    image so far, the running box-dimension estimate and the percentage
+    done.  Points are not retained and chunks hold at most CHUNK_SIZE
+    points, so memory does not grow with num_points; the comparison panel
+    is accumulated alongside and cached, so comparing this run later does
+    not recompute it.
+    """
+    num_points = int(params['num_points'])
+    counts = panel_counts = 0
+    pyramid = params.get('shape') == 'pyramid'
+    ratios = [params['r1']] if pyramid else [params['r1'], params['r2'], params['r3']]
+    # With ratios in [0, 1] every point stays in the unit cube it starts in,
+    # which lets the counter keep its coarse scales as bitmaps.
+    dim = 3 if pyramid else 2
+    bounds = (np.zeros(dim), np.ones(dim)) if all(0 <= r <= 1 for r in ratios) else None
+    counter = BoxCounter(bounds=bounds)
+    report_every = max(num_points // updates, 1)
+    chunk_size = min(max(report_every, 1 << 16), CHUNK_SIZE)
+    next_report = report_every
+    if pyramid:
+        chunks = iter_chaos_game(sierpinski_simplex(3, params['r1']), num_points,
+                                 chunk_size=chunk_size, seed=params.get('seed'))
+        add_counts = lambda chunk: voxel_counts(chunk, bins=params.get('voxels', 48))
+        figure = volume_figure
+    else:
+        chunks = iter_chaos_game_triangle(num_points, params['p1'], params['p2'],
+                                          params['r1'], params['r2'], params['r3'],
+                                          seed=params.get('seed'), chunk_size=chunk_size)
+        add_counts = lambda chunk: histogram(chunk[:, 0], chunk[:, 1],
+                                             bins=params.get('resolution', 600))
+        figure = counts_figure
+    for chunk in chunks:
+        counts = counts + add_counts(chunk)
+        panel_counts = panel_counts + histogram(chunk[:, 0], chunk[:, 1], bins=COMPARE_BINS)
+        counter.add(chunk)
+        done = counter.num_points
+        if done < next_report or done == num_points:
+            continue
+        next_report = done + report_every
+        set_progress((figure(counts),
+                      f"Box dimension estimate {counter.dimension():.4f} "
+                      f"({done:,} of {num_points:,} points)",
+                      str(int(100 * done / num_points))))
+    if params.get('seed') is not None:
+        panel_cache.set(response_key(params), (scale_counts(panel_counts), counter.dimension()))
+    return figure(counts), counter.dimension()
+
 # Add bookmark functionality
 @app.callback(
     Output('bookmarked-states', 'data'),
@@ -147,20 +476,78 @@ def add_bookmark(n_clicks, current_params, existing_bookmarks):
     return existing_bookmarks
 
 # Add comparison view
-def create_comparison_layout(params1, params2):
+def create_comparison_layout(bookmarks):
+    """Linked small multiples of the given bookmarked parameter sets."""
+    panels = list(compare_pool.map(comparison_panel, bookmarks))
     return html.Div([
         html.H2("Parameter Comparison"),
-        html.Div([
-            html.Div([
-                create_single_view(params1),
-            ], style={'width': '50%', 'display': 'inline-block'}),
-            html.Div([
-                create_single_view(params2),
-            ], style={'width': '50%', 'display': 'inline-block'})
-        ])
+        dcc.Graph(id='comparison-graph', figure=comparison_figure(bookmarks, panels),
+                  style={'height': f"{360 * ((len(bookmarks) + 1) // 2)}px"})
     ])
 
+
+def comparison_panel(params):
+    """Density levels (COMPARE_BINS pixels a side) and dimension estimate for params.
+
+    Seeded panels are cached; streamed runs store theirs as they finish.
+    Otherwise points come from chaos_game_triangle (or chaos_game_ifs), whose
+    result_cache holds the runs this process displayed and whose PointStore,
+    when configured, holds every process's.  Pyramids are drawn from above.
+    """
+    key = response_key(params)
+    panel = panel_cache.get(key) if params.get('seed') is not None else None
+    if panel is None:
+        if params.get('shape') == 'pyramid':
+            points, fd = chaos_game_ifs(sierpinski_simplex(3, params['r1']),
+                                        params['num_points'], seed=params.get('seed'),
+                                        workers=run_workers(params))
+        else:
+            points, fd = chaos_game_triangle(params['num_points'], params['p1'], params['p2'],
+                                             params['r1'], params['r2'], params['r3'],
+                                             seed=params.get('seed'), indexed=False,
+                                             workers=run_workers(params))
+        panel = (scale_counts(histogram(points[:, 0], points[:, 1], bins=COMPARE_BINS)), fd)
+        if params.get('seed') is not None:
+            panel_cache.set(key, panel)
+    return panel
+
+
+def comparison_figure(bookmarks, panels):
+    """One figure with a density panel per bookmark; all panels share their axes."""
+    cols = min(len(panels), 2)
+    rows = (len(panels) + cols - 1) // cols
+    titles = [f"{bookmark.get('timestamp', '')}: {parameter_text(bookmark)}, d={fd:.3f}"
+              for bookmark, (_, fd) in zip(bookmarks, panels)]
+    fig = make_subplots(rows=rows, cols=cols, shared_xaxes='all', shared_yaxes='all',
+                        subplot_titles=titles, horizontal_spacing=0.03, vertical_spacing=0.08)
+    for i, (levels, _) in enumerate(panels):
+        fig.add_trace(density_trace(levels), row=i // cols + 1, col=i % cols + 1)
+    fig.update_xaxes(range=list(EXTENT[0]))
+    fig.update_yaxes(range=list(EXTENT[1]))
+    fig.update_annotations(font_size=11)
+    fig.update_layout(margin=dict(l=30, r=10, t=40, b=30))
+    return fig
+
+
 def generate_figure(params):
+    """Figure (as a plain dict) and dimension estimate for params.
+
+    Seeded runs are reproducible, so their figures are cached; unseeded
+    runs are drawn afresh every time.
+    """
+    if params.get('seed') is None:
+        fig, fd = build_figure(params)
+        return fig.to_dict(), fd
+    key = response_key(params)
+    cached = figure_cache.get(key)
+    if cached is None:
+        fig, fd = build_figure(params)
+        cached = (fig.to_dict(), fd)
+        figure_cache.set(key, cached)
+    return cached
+
+
+def build_figure(params):
     """Generate a figure from the given parameters"""
     # Extract parameters
     num_points = params['num_points']
@@ -169,29 +556,50 @@ def generate_figure(params):
     r1 = params['r1']
     r2 = params['r2']
     r3 = params['r3']
+
+    if params.get('shape') == 'pyramid':
+        return pyramid_figure(params)
     
     # Generate data
-    thedata, fd = chaos_game_triangle(num_points, p1, p2, r1, r2, r3)
-    xarray = thedata[:, 1]
-    yarray = thedata[:, 2]
-    times = thedata[:, 0]
+    thedata, fd = chaos_game_triangle(num_points, p1, p2, r1, r2, r3,
+                                      seed=params.get('seed'), indexed=False,
+                                      workers=run_workers(params))
+    xarray = thedata[:, 0]
+    yarray = thedata[:, 1]
+
+    if uses_density(params):
+        return density_figure(xarray, yarray, bins=params.get('resolution', 600)), fd
     
     num_frames = 50  # Move this to a variable since we'll use it multiple times
-    
+
+    # Points are in time order, so frame k's new points are one index slice.
+    # Each slice is its own (initially hidden) trace and a frame only flips
+    # trace visibility, so the point data is sent once rather than per frame.
+    bounds = np.linspace(0, len(xarray), num_frames + 1).astype(int)
+    # Coordinates go out as typed arrays (float32 unless params ask otherwise).
+    precision = params.get('precision', 'float32')
+    xarray, xaxis = encode_axis(xarray, EXTENT[0], precision)
+    yarray, yaxis = encode_axis(yarray, EXTENT[1], precision)
+
     # Create figure
     fig = go.Figure(
         data=[go.Scatter(
-            x=[], 
-            y=[], 
+            x=xarray[start:stop],
+            y=yarray[start:stop],
             mode='markers',
+            visible=False,
+            showlegend=False,
+            # Hover would show quantized values for uint16 coordinates.
+            hoverinfo='skip' if precision == 'uint16' else None,
             marker=dict(
                 size=600/np.sqrt(num_points),
-                opacity=0.6
+                opacity=0.6,
+                color='#1f77b4'
             )
-        )],
+        ) for start, stop in zip(bounds[:-1], bounds[1:])],
         layout=go.Layout(
-            xaxis=dict(range=[-0.1, 1.1]),
-            yaxis=dict(range=[-0.1, 1.1]),
+            xaxis=xaxis,
+            yaxis=yaxis,
             # Add slider to show animation progress
             sliders=[{
                 'currentvalue': {"prefix": "Frame: "},
@@ -237,34 +645,76 @@ def generate_figure(params):
         )
     )
     
+    # Plain dicts: validating 50 x 50 go.Scatter objects dominates build time.
     frames = [
-        go.Frame(
-            data=[go.Scatter(
-                x=xarray[times < t],
-                y=yarray[times < t],
-                mode='markers',
-                marker=dict(
-                    size=600/np.sqrt(num_points),
-                    opacity=0.6
-                )
-            )],
+        dict(
+            data=[dict(type='scatter', visible=k <= i) for k in range(num_frames)],
+            traces=list(range(num_frames)),
             name=f'frame{i}'  # Changed to match slider frame names
         )
-        for i, t in enumerate(np.linspace(np.min(times), np.max(times), num_frames))
+        for i in range(num_frames)
     ]
 
     fig.frames = frames
     return fig, fd
 
-def create_single_view(params):
-    return html.Div([
-        html.H3("Parameters:"),
-        html.P(f"Points: {params['num_points']}"),
-        html.P(f"p1: {params['p1']:.3f}, p2: {params['p2']:.3f}"),
-        html.P(f"r1: {params['r1']:.3f}, r2: {params['r2']:.3f}, r3: {params['r3']:.3f}"),
-        dcc.Graph(id={'type': 'dynamic-graph', 'index': id(params)},
-                 figure=generate_figure(params))
-    ])
+def pyramid_figure(params):
+    """3D view of the Sierpinski pyramid, every map with ratio r1 and equal weight.
+
+    Large runs are binned into voxels on the server rather than sent as
+    Scatter3d markers.
+    """
+    points, fd = chaos_game_ifs(sierpinski_simplex(3, params['r1']), params['num_points'],
+                                seed=params.get('seed'), workers=run_workers(params))
+    if uses_density(params):
+        return volume_figure(voxel_counts(points, bins=params.get('voxels', 48))), fd
+    x, y, z = points.astype(np.float32).T
+    fig = go.Figure(
+        data=[go.Scatter3d(x=x, y=y, z=z, mode='markers',
+                           marker=dict(size=2, opacity=0.6, color='#1f77b4'))],
+        layout=go.Layout(scene=dict(xaxis=dict(range=list(EXTENT3[0])),
+                                    yaxis=dict(range=list(EXTENT3[1])),
+                                    zaxis=dict(range=list(EXTENT3[2])),
+                                    aspectmode='cube'))
+    )
+    return fig, fd
+
+
+def warm_up():
+    """Prewarm the response cache, which also loads plotly's validators and warms numpy."""
+    prewarm()
+
+
+def run_workers(params):
+    """Worker processes for generating the points of params (None runs in process)."""
+    return WORKERS if WORKERS > 1 and params['num_points'] >= PARALLEL_POINTS else None
+
+
+def uses_density(params):
+    """Whether params render as a density image rather than animated markers."""
+    render_mode = params.get('render', 'auto')
+    return render_mode == 'density' or (render_mode == 'auto' and params['num_points'] > SCATTER_LIMIT)
+
+
+@app.callback(
+    Output('point-cloud-animation', 'figure', allow_duplicate=True),
+    Input('point-cloud-animation', 'relayoutData'),
+    State('current-params', 'data'),
+    prevent_initial_call=True
+)
+def zoom_view(relayout_data, params):
+    """Re-render density views for the zoomed or panned window from cached tiles."""
+    if (not relayout_data or not params or not uses_density(params)
+            or params.get('shape', 'triangle') != 'triangle'):
+        raise PreventUpdate
+    # Other relayout events (autosize, drag mode, ...) leave the view as is.
+    if not any(key.startswith(('xaxis.', 'yaxis.')) for key in relayout_data):
+        raise PreventUpdate
+    window = list(EXTENT)
+    for i, axis in enumerate(('xaxis', 'yaxis')):
+        if f'{axis}.range[0]' in relayout_data:
+            window[i] = (relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]'])
+    return zoom_figure(params, tuple(window))
 
 # Add UI elements for bookmarks and comparison
 app.layout.children.extend([
@@ -278,18 +728,78 @@ app.layout.children.extend([
 
 @app.callback(
     Output('bookmark-list', 'children'),
-    Input('bookmarked-states', 'data')
+    Input('bookmarked-states', 'data'),
+    Input('compare-selection', 'data')
 )
-def update_bookmark_list(bookmarks):
+def update_bookmark_list(bookmarks, selection):
     if not bookmarks:
         return "No bookmarks yet"
+    selection = selection or []
     
     return html.Ul([
         html.Li([
             f"State from {bookmark['timestamp']}: ",
             html.Button('Load', id={'type': 'load-bookmark', 'index': i}),
-            html.Button('Compare', id={'type': 'compare-bookmark', 'index': i})
+            html.Button('Remove from comparison' if i in selection else 'Compare',
+                        id={'type': 'compare-bookmark', 'index': i})
         ]) for i, bookmark in enumerate(bookmarks)
     ])
+
+
+def clicked_index():
+    """Index of the pattern-matched button that triggered a callback, if one was clicked.
+
+    Re-rendering the bookmark list also fires these callbacks, with no clicks.
+    """
+    if not dash.ctx.triggered or not dash.ctx.triggered[0]['value']:
+        raise PreventUpdate
+    return dash.ctx.triggered_id['index']
+
+
+def bookmark_query(bookmark):
+    """URL query string reproducing a bookmarked run."""
+    keys = ('num_points', 'p1', 'p2', 'r1', 'r2', 'r3', 'seed', 'render', 'precision', 'shape')
+    return '?' + urllib.parse.urlencode({k: bookmark[k] for k in keys
+                                         if bookmark.get(k) is not None})
+
+
+@app.callback(
+    Output('url', 'search'),
+    Input({'type': 'load-bookmark', 'index': ALL}, 'n_clicks'),
+    State('bookmarked-states', 'data'),
+    prevent_initial_call=True
+)
+def load_bookmark(n_clicks, bookmarks):
+    """Show a bookmarked run in the main view by moving to its URL."""
+    return bookmark_query(bookmarks[clicked_index()])
+
+
+@app.callback(
+    Output('compare-selection', 'data'),
+    Input({'type': 'compare-bookmark', 'index': ALL}, 'n_clicks'),
+    State('compare-selection', 'data'),
+    prevent_initial_call=True
+)
+def toggle_comparison(n_clicks, selection):
+    """Add a bookmark to the comparison view, or remove it if already shown."""
+    index = clicked_index()
+    selection = list(selection or [])
+    if index in selection:
+        selection.remove(index)
+    else:
+        selection.append(index)
+    return selection
+
+
+@app.callback(
+    Output('comparison-view', 'children'),
+    Input('compare-selection', 'data'),
+    State('bookmarked-states', 'data')
+)
+def update_comparison(selection, bookmarks):
+    if not selection or not bookmarks:
+        return []
+    return create_comparison_layout([bookmarks[i] for i in selection if i < len(bookmarks)])
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,188 @@
+"""Benchmarks of point generation, box counting, dimension solving and figure building.
+
+Every case is timed with time.perf_counter (best of several runs) and run
+once more under tracemalloc for its peak memory.  Results can be saved as a
+baseline and later runs compared against it; a case slower or hungrier than
+its baseline by more than the tolerance is flagged and the exit status is 1:
+
+    python bench.py --save baseline.json
+    python bench.py --compare baseline.json
+    python bench.py --quick --only 'box_counting/*'
+
+Caches are bypassed (runs are unseeded or call the uncached builders), so
+the numbers are those of the engines themselves.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import fracdim
+from chaos_game import chaos_game_triangle
+from critexp import similarity_dimension, solve_for_d
+from ifs import ENGINES
+
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+QUICK_SIZES = [10**3, 10**4, 10**5]
+
+# The loop engine takes one Python step per point, the unique box counter
+# sorts rows at every scale, and marker figures of more points are never
+# drawn (see app.SCATTER_LIMIT).
+LOOP_MAX_POINTS = 10**4
+UNIQUE_MAX_POINTS = 10**6
+SCATTER_MAX_POINTS = 10**5
+
+# Runs of a case are repeated until they take this long in total (or
+# MAX_REPEAT runs), and the fastest is reported.
+MIN_SECONDS = 0.5
+MAX_REPEAT = 5
+
+# Allowed slowdown and growth in peak memory relative to a baseline.
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+
+
+def generation_cases(sizes):
+    """chaos_game_triangle for every engine and number of points."""
+    for engine in ENGINES:
+        for n in sizes:
+            if engine == 'loop' and n > LOOP_MAX_POINTS:
+                continue
+            yield (f"chaos_game_triangle/{engine}/N={n}",
+                   lambda n=n, engine=engine: chaos_game_triangle(n, engine=engine, indexed=False))
+
+
+def box_counting_cases(sizes, scales=(10, 30)):
+    """box_counting for every engine, and fractal_dimension, over N and number of scales."""
+    for n in sizes:
+        points, _ = chaos_game_triangle(n, seed=0, indexed=False)
+        for num_scales in scales:
+            box_sizes = np.logspace(-4, 0, num_scales)
+            dyadic = fracdim.dyadic_box_sizes(2.0**-13, num_scales)
+            for engine in fracdim.ENGINES:
+                if engine == 'unique' and n > UNIQUE_MAX_POINTS:
+                    continue
+                sizes_for_engine = dyadic if engine == 'dyadic' else box_sizes
+                yield (f"box_counting/{engine}/N={n}/scales={num_scales}",
+                       lambda points=points, s=sizes_for_engine, engine=engine:
+                       fracdim.box_counting(points, s, engine=engine))
+            yield (f"fractal_dimension/N={n}/scales={num_scales}",
+                   lambda points=points, s=box_sizes: fracdim.fractal_dimension(points, s))
+
+
+def solver_cases(batch=10**4):
+    """solve_for_d one triple at a time, and similarity_dimension on the whole batch."""
+    ratios = np.random.default_rng(0).uniform(0.05, 0.95, (batch, 3))
+    yield (f"solve_for_d/batch={batch}",
+           lambda: [solve_for_d(*r) for r in ratios.tolist()])
+    yield (f"similarity_dimension/batch={batch}",
+           lambda: similarity_dimension(ratios))
+
+
+def figure_cases(sizes):
+    """app.build_figure and its JSON serialization, for markers and density images."""
+    import app
+    for n in sizes:
+        for render in ('scatter', 'density'):
+            if render == 'scatter' and n > SCATTER_MAX_POINTS:
+                continue
+            params = dict(app.DEFAULT_PARAMS, num_points=n, render=render, seed=None)
+            yield (f"generate_figure/{render}/N={n}",
+                   lambda params=params: {'json_bytes': len(app.build_figure(params)[0].to_json())})
+
+
+def measure(func):
+    """Best and median seconds, peak traced bytes and any extra numbers func returns."""
+    times = []
+    while len(times) < MAX_REPEAT and (not times or sum(times) < MIN_SECONDS):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    record = {'seconds': min(times), 'median': float(np.median(times)),
+              'repeat': len(times), 'peak_bytes': peak}
+    if isinstance(result, dict):
+        record.update(result)
+    return record
+
+
+def regressions(results, baseline, time_tolerance=TIME_TOLERANCE,
+                memory_tolerance=MEMORY_TOLERANCE):
+    """Descriptions of cases slower or larger than baseline beyond the tolerances."""
+    found = []
+    for name, record in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, tolerance in (('seconds', time_tolerance), ('peak_bytes', memory_tolerance),
+                               ('json_bytes', memory_tolerance)):
+            if key in record and key in base and record[key] > base[key] * (1 + tolerance):
+                found.append(f"{name}: {key} {base[key]:.4g} -> {record[key]:.4g} "
+                             f"({record[key] / base[key] - 1:+.0%})")
+    return found
+
+
+def all_cases(sizes, groups):
+    cases = {'generation': lambda: generation_cases(sizes),
+             'box_counting': lambda: box_counting_cases(sizes),
+             'solver': lambda: solver_cases(),
+             'figure': lambda: figure_cases([n for n in sizes if n <= 10**6])}
+    for group in groups:
+        yield from cases[group]()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help=f"only N up to {QUICK_SIZES[-1]:,}")
+    parser.add_argument('--group', action='append',
+                        choices=['generation', 'box_counting', 'solver', 'figure'],
+                        help="benchmark groups to run (default all)")
+    parser.add_argument('--only', default='*', help="glob on case names")
+    parser.add_argument('--save', help="write results to this JSON baseline")
+    parser.add_argument('--compare', help="flag regressions against this JSON baseline")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    groups = args.group or ['generation', 'box_counting', 'solver', 'figure']
+    results = {}
+    for name, func in all_cases(sizes, groups):
+        if not fnmatch.fnmatch(name, args.only):
+            continue
+        record = results[name] = measure(func)
+        extra = f"  {record['json_bytes'] / 2**20:8.2f} MiB JSON" if 'json_bytes' in record else ''
+        print(f"{name:48s} {record['seconds'] * 1e3:10.2f} ms  "
+              f"{record['peak_bytes'] / 2**20:8.2f} MiB peak{extra}", flush=True)
+
+    if args.save:
+        meta = {'date': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'numpy': np.__version__,
+                'machine': platform.machine(), 'processor': platform.processor()}
+        with open(args.save, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        found = regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        print(f"{len(found)} regressions against {args.compare}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""Caches for generated point clouds, tiles and figures.
+
+Every backend has the same get/set/clear/stats interface and is bounded by
+the total size of its values, with an optional time to live:
+
+- LRUCache: in process memory.
+- DiskCache: one pickle file per entry in a directory.  Point arrays do
+  not go here but to store.PointStore, which maps them zero-copy.
+- SQLiteCache: one table of a SQLite database.  Every worker on the host
+  reads and writes the same file, so a result computed by one gunicorn
+  worker is served by all of them.
+
+make_cache picks the backend named by CHAOS_CACHE_BACKEND ('memory',
+'disk' or 'sqlite'; default 'memory'), stored under CHAOS_CACHE_DIR
+(default ./.cache), with CHAOS_CACHE_TTL seconds to live (default none).
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def nbytes(value):
+    """Approximate memory footprint of a value, counting numpy buffers in full."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Least-recently-used mapping bounded by the total size of its values.
+
+    Entries larger than max_bytes are not stored, and entries older than
+    ttl seconds (if given) are treated as missing.  Safe to share between
+    threads.
+    """
+
+    def __init__(self, max_bytes, sizeof=nbytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            value, size, expires = self._data[key]
+            if expires is not None and time.time() > expires:
+                del self._data[key]
+                self.nbytes -= size
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.nbytes -= self._data.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            expires = None if self.ttl is None else time.time() + self.ttl
+            self._data[key] = (value, size, expires)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+
+    def stats(self):
+        """Hit and miss counts, number of entries and bytes held."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._data),
+                    'bytes': self.nbytes, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+def atomic_write(path, write):
+    """Create path from write(f) on a temporary file renamed into place.
+
+    Readers in other processes see either the old file or the whole new one.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        unlink_quietly(tmp)
+        raise
+
+
+def unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def touch(path):
+    """Refresh the modification time of path, which orders eviction."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def file_entries(root, suffix):
+    """(mtime, size, path without suffix) of every file under root ending in suffix."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(suffix):
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, st.st_size, full[:-len(suffix)]))
+    return found
+
+
+def evict_files(root, suffixes, max_bytes):
+    """Remove the least recently used entries under root until they total max_bytes.
+
+    An entry is the set of files sharing a name with the given suffixes; the
+    first suffix is the one sized and timed.
+    """
+    entries = sorted(file_entries(root, suffixes[0]))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        for suffix in suffixes:
+            unlink_quietly(path + suffix)
+        total -= size
+
+
+def _digest(key):
+    """Stable name for a key; keys are tuples of numbers and strings."""
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+class DiskCache:
+    """Pickled values in a directory, bounded by max_bytes and an optional ttl.
+
+    Writes are atomic renames, so several processes may share the
+    directory.  Reads refresh a file's modification time and eviction
+    removes the least recently used files first.
+    """
+
+    def __init__(self, root, max_bytes, ttl=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, _digest(key) + '.pkl')
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        if expires is not None and time.time() > expires:
+            unlink_quietly(path)
+            self.misses += 1
+            return default
+        touch(path)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        data = pickle.dumps((None if self.ttl is None else time.time() + self.ttl, value),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        atomic_write(self._path(key), lambda f: f.write(data))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used files until within max_bytes."""
+        evict_files(self.root, ('.pkl',), self.max_bytes)
+
+    def stats(self):
+        entries = file_entries(self.root, '.pkl')
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        for _, _, path in file_entries(self.root, '.pkl'):
+            unlink_quietly(path + '.pkl')
+
+
+class SQLiteCache:
+    """Pickled values in one table of a SQLite database shared by processes.
+
+    The database runs in WAL mode so readers do not block the writer.
+    Entries past their ttl are ignored and deleted; when the table holds
+    more than max_bytes the least recently read rows go first.
+    """
+
+    def __init__(self, path, table, max_bytes, ttl=None):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                         'key TEXT PRIMARY KEY, value BLOB, size INTEGER, '
+                         'expires REAL, accessed REAL)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS "{table}_accessed" ON "{table}" (accessed)')
+
+    def _connect(self):
+        """This process's connection; forked workers open their own."""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key, default=None):
+        digest = _digest(key)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(f'SELECT value, expires FROM "{self.table}" WHERE key = ?',
+                               (digest,)).fetchone()
+            if row is None or (row[1] is not None and now > row[1]):
+                if row is not None:
+                    conn.execute(f'DELETE FROM "{self.table}" WHERE key = ?', (digest,))
+                self.misses += 1
+                return default
+            conn.execute(f'UPDATE "{self.table}" SET accessed = ? WHERE key = ?', (now, digest))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        expires = None if self.ttl is None else now + self.ttl
+        with self._lock, self._connect() as conn:
+            conn.execute(f'INSERT OR REPLACE INTO "{self.table}" VALUES (?, ?, ?, ?, ?)',
+                         (_digest(key), data, len(data), expires, now))
+            total = conn.execute(f'SELECT COALESCE(SUM(size), 0) FROM "{self.table}"').fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute(f'SELECT key, size FROM "{self.table}" ORDER BY accessed')
+                doomed = []
+                for digest, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((digest,))
+                    total -= size
+                conn.executemany(f'DELETE FROM "{self.table}" WHERE key = ?', doomed)
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM "{self.table}"').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries,
+                'bytes': size, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute(f'DELETE FROM "{self.table}"')
+
+
+BACKENDS = ('memory', 'disk', 'sqlite')
+
+
+def make_cache(name, max_bytes, backend=None, ttl=None):
+    """Cache called name on the configured backend (see the module docstring).
+
+    backend and ttl override CHAOS_CACHE_BACKEND and CHAOS_CACHE_TTL.
+    """
+    backend = backend or os.environ.get('CHAOS_CACHE_BACKEND', 'memory')
+    if ttl is None and os.environ.get('CHAOS_CACHE_TTL'):
+        ttl = float(os.environ['CHAOS_CACHE_TTL'])
+    root = os.environ.get('CHAOS_CACHE_DIR', './.cache')
+    if backend == 'memory':
+        return LRUCache(max_bytes, ttl=ttl)
+    if backend == 'disk':
+        return DiskCache(os.path.join(root, name), max_bytes, ttl)
+    if backend == 'sqlite':
+        return SQLiteCache(os.path.join(root, 'cache.sqlite'), name, max_bytes, ttl)
+    raise ValueError(f"Unknown cache backend {backend!r}; expected one of {BACKENDS}.")
@@ -1,34 +1,135 @@
 import numpy as np
-from fracdim import fractal_dimension
+from cache import make_cache
+from fracdim import DimensionEstimate, fractal_dimension
+from ifs import (BURN_IN, CHUNK_SIZE, TRIANGLE_VERTICES, chaos_game, enumerate_attractor,
+                 iter_chaos_game, sierpinski_triangle)
+# Defined here before the general IFS engine moved them to ifs; re-exported
+# for code that still imports them from chaos_game.
+from ifs import BLOCK_SIZE, ENGINES  # noqa: F401
+from store import get_default_store
+
+# Seeded results of chaos_game_triangle, keyed by their parameters.  Always
+# in process memory: on disk, point arrays live in the PointStore, which
+# serves them as zero-copy memory maps.
+result_cache = make_cache('points', max_bytes=256 * 2**20, backend='memory')
+
+
+def triangle_maps(p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2):
+    """The triangle's maps x -> r_i * x + (1 - r_i) * v_i as an affine table.
+
+    Returns (matrices, offsets, probabilities, vertices) with matrices of
+    shape (3, 2, 2) and offsets of shape (3, 2); vertices is the convex hull
+    containing the attractor when every r_i is in (0, 1).
+    """
+    ifs = sierpinski_triangle(p1, p2, r1, r2, r3)
+    return ifs.matrices, ifs.offsets, ifs.weights, TRIANGLE_VERTICES.copy()
+
+
+def iter_chaos_game_triangle(num_iterations, p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2,
+                             engine='vectorized', chunk_size=CHUNK_SIZE, seed=None):
+    """Yield the chaos-game trajectory as consecutive (n, 2) chunks.
+
+    The current point and RNG state carry over from one chunk to the next,
+    so concatenating the chunks gives the same trajectory as one long run
+    while only a single chunk is held in memory at a time.  seed may be
+    anything np.random.default_rng accepts; None uses the global state.
+    """
+    return iter_chaos_game(sierpinski_triangle(p1, p2, r1, r2, r3), num_iterations,
+                           engine=engine, chunk_size=chunk_size, seed=seed)
+
 
 # Step 1: Define the chaos game function with probabilities
-def chaos_game_triangle(num_iterations, p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2):
-    # Define the vertices of the triangle
-    vertices = np.array([[0, 0], [0, 1], [1, 0]])
-    rlist = [r1, r2, r3]
-    
-    # Probabilities for selecting each vertex
-    p3 = 1 - p1 - p2
-    probabilities = [p1, p2, p3]
-    
-    # Choose a random initial point inside the triangle
-    p = np.random.rand(2)
-    
-    # Create a list to store the points
-    point_list = [p]
-    
-    # Perform the iterations
-    for _ in range(num_iterations-1):
-        # Pick a random vertex based on probabilities
-        ind = np.random.choice(len(vertices), p=probabilities)
-        q = vertices[ind]
-        r = rlist[ind]
-        # Compute the midpoint
-        p = r * p + (1-r) * q
-        point_list.append(p)
-    
-    pointarray = np.array(point_list)
+def chaos_game_triangle(num_iterations, p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2,
+                        engine='vectorized', chunk_size=CHUNK_SIZE, workers=None,
+                        burn_in=BURN_IN, seed=None, indexed=True):
+    """Run the chaos game and estimate the box dimension of the result.
+
+    Returns (points, fd).  points has the step index in column 0 and the
+    point in columns 1-2; with indexed=False it is just the (N, 2) points,
+    which avoids building the index column at all.  fd is a
+    fracdim.DimensionEstimate, a float carrying its interval.
+
+    With workers > 1 the run is split across that many independent walkers in
+    a process pool, each discarding burn_in initial steps.  Runs with an
+    integer seed are reproducible and served from result_cache when possible,
+    then from the on-disk store named by CHAOS_STORE_DIR as a read-only
+    memmap; cached arrays are read-only.
+    """
+    num_iterations = int(num_iterations)
+    # Triangle runs keep their original cache keys, so stored results stay valid.
+    pointarray, fd = _chaos_game_points(sierpinski_triangle(p1, p2, r1, r2, r3),
+                                        (float(p1), float(p2), float(r1), float(r2), float(r3)),
+                                        num_iterations, engine, chunk_size, workers, burn_in, seed)
+    if not indexed:
+        return pointarray, fd
+    indexed_array = np.empty((num_iterations, 3))
+    indexed_array[:, 0] = np.arange(num_iterations)
+    indexed_array[:, 1:] = pointarray
+    return indexed_array, fd
+
+
+def enumerate_triangle(resolution=2.0**-9, p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2,
+                       min_mass=0.0, depth=64):
+    """Deterministic alternative to chaos_game_triangle: enumerate IFS addresses.
+
+    Every part of the attractor is covered down to cells about resolution
+    across (see ifs.enumerate_attractor), however unlikely the random walk
+    is to reach it, so the box dimension is fitted on box sizes from
+    2 * resolution up to 1 and needs far fewer points than a random run.
+    Returns (points, fd, mass) with points of shape (N, 2); results are
+    cached.
+    """
+    key = ('addresses', float(resolution), float(p1), float(p2), float(r1), float(r2),
+           float(r3), float(min_mass), int(depth))
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+    points, mass = enumerate_attractor(sierpinski_triangle(p1, p2, r1, r2, r3), depth,
+                                       min_mass=min_mass, resolution=resolution)
+    finest = max(2 * resolution, max(abs(r1), abs(r2), abs(r3)) ** depth)
+    # Enumerated points are not a random sample: there is nothing to bootstrap,
+    # and boxes down to the resolution are covered however few points they hold.
+    fd = fractal_dimension(points, np.logspace(np.log10(finest), 0, 30), bootstrap=0,
+                           max_singletons=1)
+    points.flags.writeable = False
+    result_cache.set(key, (points, fd, mass))
+    return points, fd, mass
+
+
+def chaos_game_ifs(ifs, num_iterations, engine='vectorized', chunk_size=CHUNK_SIZE,
+                   workers=None, burn_in=BURN_IN, seed=None):
+    """Run the chaos game of any IFS and estimate the box dimension of the result.
+
+    Returns ((N, d) points, fd), cached like chaos_game_triangle.
+    """
+    return _chaos_game_points(ifs, ifs.key(), int(num_iterations), engine, chunk_size,
+                              workers, burn_in, seed)
+
+
+def _chaos_game_points(ifs, ifs_key, num_iterations, engine, chunk_size, workers, burn_in, seed):
+    """The (N, d) trajectory and its dimension, through the caches when seeded."""
+    workers = workers if workers is not None and workers > 1 else 1
+    key = None
+    if isinstance(seed, (int, np.integer)):
+        key = (num_iterations,) + ifs_key + (int(seed), engine, workers,
+                                             burn_in if workers > 1 else 0)
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+        store = get_default_store()
+        if store is not None:
+            stored = store.get(key)
+            if stored is not None:
+                return stored[0], DimensionEstimate.from_value(stored[1]['fd'])
+
+    pointarray = chaos_game(ifs, num_iterations, engine=engine, chunk_size=chunk_size,
+                            workers=workers, burn_in=burn_in, seed=seed)
+
     fd = fractal_dimension(pointarray)
-    #fd = fractal_dimension(pointarray)
-    indexed_array = np.column_stack((np.arange(num_iterations), pointarray))
-    return indexed_array, fd
\ No newline at end of file
+    if key is not None:
+        pointarray.flags.writeable = False
+        result_cache.set(key, (pointarray, fd))
+        store = get_default_store()
+        if store is not None:
+            store.put(key, pointarray, {'fd': fd._asdict()})
+    return pointarray, fd
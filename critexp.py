@@ -1,19 +1,6 @@
 
 
-def bisection(f, a, b, tol=1e-6):
-    #print(f"a: {f(a)}, b: {f(b)}")
-    if f(a) * f(b) >= 0:
-        return b
-    while (b - a) / 2 > tol:
-        c = (a + b) / 2
-        if f(c) == 0:
-            return c
-        elif f(a) * f(c) < 0:
-            b = c
-        else:
-            a = c
-    return (a + b) / 2
-
+import numpy as np
 
 
 def solve_for_d(x: float, y: float, z: float) -> float:
@@ -26,7 +13,7 @@ def solve_for_d(x: float, y: float, z: float) -> float:
         z (float): Value of z, must be in the range (0, 1].
         
     Returns:
-        float: The solution for d.
+        float: The solution for d, or inf if any of x, y, z equals 1.
         
     Raises:
         ValueError: If x, y, or z is not in the range (0, 1].
@@ -35,12 +22,100 @@ def solve_for_d(x: float, y: float, z: float) -> float:
     if not (0 < x <= 1 and 0 < y <= 1 and 0 < z <= 1):
         raise ValueError("x, y, and z must all be in the range (0, 1].")
 
-    # Define the equation
-    def equation(d):
-        return x**d + y**d + z**d - 1
+    return float(similarity_dimension([x, y, z]))
+
+
+def _moran_root(log_r, log_w, tol, max_iter):
+    """Vectorized safeguarded Newton solve of sum_i exp(d * log_r[..., i] + log_w[..., i]) = 1.
+
+    The left side is strictly decreasing in d, so a bracket [lo, hi] with
+    f(lo) >= 0 >= f(hi) is grown geometrically from the initial guess, up or
+    down as needed (weights below 1 can put the root at a negative d), and
+    every Newton step that leaves it is replaced by bisection.  Rows with a
+    zero log_r of weight at least 1 (and more than one term) have no root and
+    get inf, as do rows whose bracket never closes.
+    """
+    def f(d):
+        terms = np.exp(d[..., None] * log_r + log_w)
+        return terms.sum(axis=-1) - 1, (terms * log_r).sum(axis=-1)
+
+    m = log_r.shape[-1]
+    # Exact when all ratios are equal, and a good start otherwise.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        guess = np.log(np.exp(log_w).sum(axis=-1)) / -log_r.mean(axis=-1)
+    guess = np.where(np.isfinite(guess), guess, 1.0)
 
-    # Solve using root_scalar with a reasonable bracket
+    lo = np.minimum(guess, 0.0)
+    hi = np.maximum(guess, 1.0)
+    step = hi - lo
+    hi_open = f(hi)[0] > 0
+    lo_open = f(lo)[0] < 0
+    for _ in range(64):
+        if not (hi_open | lo_open).any():
+            break
+        lo, hi = np.where(hi_open, hi, lo), np.where(lo_open, lo, hi)
+        hi = np.where(hi_open, hi + step, hi)
+        lo = np.where(lo_open, lo - step, lo)
+        step = 2 * step
+        hi_open &= f(hi)[0] > 0
+        lo_open &= f(lo)[0] < 0
 
-    result = bisection(equation, 0, 2)
+    d = np.clip(guess, lo, hi)
+    for _ in range(max_iter):
+        fd, dfd = f(d)
+        lo = np.where(fd >= 0, d, lo)
+        hi = np.where(fd <= 0, d, hi)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = d - fd / dfd
+        inside = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        new = np.where(inside, newton, (lo + hi) / 2)
+        done = np.abs(new - d) <= tol * (1 + np.abs(d))
+        d = new
+        if done.all():
+            break
+    no_root = hi_open | lo_open | (((log_r == 0) & (log_w >= 0)).any(axis=-1) & (m > 1))
+    return np.where(no_root, np.inf, d)
 
-    return result
\ No newline at end of file
+
+def similarity_dimension(ratios, weights=None, tol=1e-12, max_iter=100):
+    """
+    Solve for d in sum_i w_i r_i^d = 1, for any number of ratios and many sets at once.
+
+    Args:
+        ratios (array_like): Contraction ratios in (0, 1], shape (..., m); the
+            last axis holds the ratios of one set, leading axes index sets.
+        weights (array_like, optional): Non-negative w_i broadcastable against
+            ratios; all 1 by default, giving the similarity dimension.  With
+            w_i = p_i^q the solution is -tau(q) of the self-similar measure
+            with probabilities p_i, which is negative for q > 1.
+        tol (float): Relative tolerance on d.
+        max_iter (int): Maximum number of Newton/bisection iterations.
+
+    Returns:
+        ndarray or float: The solution for every set, shape (...).  Sets with
+        no finite solution (e.g. two or more ratios including a 1 without
+        weights) give inf.
+
+    Raises:
+        ValueError: If a ratio is not in the range (0, 1], a weight is
+            negative or a set is empty.
+    """
+    ratios = np.asarray(ratios, dtype=float)
+    if ratios.ndim == 0 or ratios.shape[-1] == 0:
+        raise ValueError("ratios must have at least one entry per set.")
+    if not np.all((ratios > 0) & (ratios <= 1)):
+        raise ValueError("ratios must all be in the range (0, 1].")
+    if weights is None:
+        log_w = np.zeros(ratios.shape)
+    else:
+        weights = np.asarray(weights, dtype=float)
+        if np.any(weights < 0):
+            raise ValueError("weights must be non-negative.")
+        with np.errstate(divide='ignore'):
+            log_w = np.log(weights)
+        ratios, log_w = np.broadcast_arrays(ratios, log_w)
+    d = _moran_root(np.log(ratios), log_w, tol, max_iter)
+    # A single ratio solves r^d = 1 at d = 0 (also when r == 1).
+    if weights is None and ratios.shape[-1] == 1:
+        d = np.zeros(d.shape)
+    return d if d.ndim else float(d)
@@ -1,7 +1,79 @@
 import numpy as np
 #import matplotlib.pyplot as plt
 
-def box_counting(points, box_sizes):
+
+def _box_indices(points, size):
+    """Integer box coordinates of every point on the grid of the given size."""
+    return np.floor(points / size).astype(np.int64)
+
+
+def _box_keys(points, size):
+    """Encode the box of every point on the grid of the given size as an int64.
+
+    Box coordinates are shifted by their minimum and read as mixed-radix
+    numbers, so keys lie in [0, num_cells) and points share a key exactly
+    when they share a box.  Returns (keys, num_cells); raises OverflowError
+    if the grid spanned by the points has 2**63 cells or more.
+    """
+    keys = None
+    num_cells = 1
+    for j in range(points.shape[1]):
+        col = np.floor(points[:, j] / size).astype(np.int64)
+        lo = col.min()
+        extent = int(col.max()) - int(lo) + 1
+        num_cells *= extent
+        if num_cells >= 2**63:
+            raise OverflowError("box coordinates do not fit in an int64 key")
+        col -= lo
+        if keys is None:
+            keys = col
+        else:
+            keys *= extent
+            keys += col
+    return keys, num_cells
+
+
+def _count_sorted(keys):
+    """Number of distinct values in a sorted 1-D array."""
+    if len(keys) == 0:
+        return 0
+    return 1 + int(np.count_nonzero(keys[1:] != keys[:-1]))
+
+
+def _sorted_unique(keys):
+    """Distinct values of a 1-D array in ascending order."""
+    keys = np.sort(keys)
+    if len(keys) == 0:
+        return keys
+    keep = np.empty(len(keys), dtype=bool)
+    keep[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    return keys[keep]
+
+
+def _count_rows(boxes):
+    """Number of distinct rows of an (n, d) integer array, by lexicographic sort.
+
+    Used when the grid is too large for one int64 key per box, as happens
+    for fine scales in higher dimensions.
+    """
+    if len(boxes) == 0:
+        return 0
+    boxes = boxes[np.lexsort(boxes.T[::-1])]
+    return 1 + int(np.count_nonzero((boxes[1:] != boxes[:-1]).any(axis=1)))
+
+
+def _count_distinct(keys, num_cells):
+    """Number of distinct keys in [0, num_cells), sorting only for sparse grids."""
+    if num_cells <= 4 * len(keys):
+        occupied = np.zeros(num_cells, dtype=bool)
+        occupied[keys] = True
+        return int(np.count_nonzero(occupied))
+    keys.sort()
+    return _count_sorted(keys)
+
+
+def _count_unique(points, box_sizes):
     counts = []
     for size in box_sizes:
         boxes = np.floor(points / size).astype(int)
@@ -9,7 +81,636 @@ def box_counting(points, box_sizes):
         counts.append(len(unique_boxes))
     return counts
 
-def fractal_dimension(points, box_sizes=np.logspace(-4, 0, 30)):
-    counts = box_counting(points, box_sizes)
-    coeffs = np.polyfit(np.log(box_sizes), np.log(counts), 1)
-    return -coeffs[0]
\ No newline at end of file
+
+def _count_keys(points, box_sizes):
+    counts = []
+    for size in box_sizes:
+        try:
+            keys, num_cells = _box_keys(points, size)
+        except OverflowError:
+            counts.append(_count_rows(_box_indices(points, size)))
+            continue
+        counts.append(_count_distinct(keys, num_cells))
+    return counts
+
+
+def _dyadic_levels(box_sizes):
+    """Levels k with box_sizes[i] == min(box_sizes) * 2**k exactly, or None."""
+    box_sizes = np.asarray(box_sizes, dtype=float)
+    if len(box_sizes) == 0 or np.any(box_sizes <= 0):
+        return None
+    finest = box_sizes.min()
+    levels = np.rint(np.log2(box_sizes / finest)).astype(np.int64)
+    if np.any(levels > 60) or np.any(finest * 2.0 ** levels != box_sizes):
+        return None
+    return levels
+
+
+def _morton_keys(boxes, levels):
+    """Interleave the bits of the box coordinates (Z-order).
+
+    Coordinates are offset by a multiple of 2**levels, so dropping the low
+    d * k bits of a key gives the key of the enclosing box k levels coarser.
+    """
+    n, d = boxes.shape
+    lo = (boxes.min(axis=0) >> levels) << levels
+    coords = boxes - lo
+    bits = int(coords.max()).bit_length() if n else 0
+    if bits * d > 63:
+        raise OverflowError("box coordinates do not fit in an int64 key")
+    keys = np.zeros(n, dtype=np.int64)
+    for b in range(bits):
+        for j in range(d):
+            keys |= ((coords[:, j] >> b) & 1) << (b * d + d - 1 - j)
+    return keys
+
+
+def _count_dyadic(points, box_sizes):
+    """Count every scale from one sort of the finest-level Morton keys."""
+    levels = _dyadic_levels(box_sizes)
+    boxes = _box_indices(points, np.min(box_sizes))
+    d = boxes.shape[1]
+    try:
+        keys = _morton_keys(boxes, int(levels.max()))
+    except OverflowError:
+        return _count_keys(points, box_sizes)
+    keys.sort()
+    return [_count_sorted(keys >> (d * int(k))) for k in levels]
+
+
+def _count_bitmap(points, box_sizes, memory_limit=None):
+    """Count with BoxCounter over the bounding box of the points."""
+    if memory_limit is None:
+        memory_limit = MEMORY_LIMIT
+    counter = BoxCounter(box_sizes, bounds=(points.min(axis=0), points.max(axis=0)),
+                         memory_limit=memory_limit)
+    counter.add(points)
+    return counter.counts()
+
+
+ENGINES = {
+    'unique': _count_unique,
+    'keys': _count_keys,
+    'dyadic': _count_dyadic,
+    'bitmap': _count_bitmap,
+}
+
+# Default budget, in bytes, for the packed bitmaps of a BoxCounter.
+MEMORY_LIMIT = 64 * 2**20
+
+
+def dyadic_box_sizes(finest=2.0**-13, num_sizes=14):
+    """Box sizes finest * 2**k, k = 0..num_sizes-1, for the dyadic engine."""
+    return finest * 2.0 ** np.arange(num_sizes)
+
+
+def box_counting(points, box_sizes, engine='auto', memory_limit=None):
+    """Number of occupied boxes of each size.
+
+    Engines give identical counts: 'unique' sorts the rows of box indices at
+    every scale, 'keys' encodes each box as one int64 and counts those with
+    an occupancy table (small grids) or a 1-D sort (large grids), and
+    'dyadic' (box sizes must be the finest size times powers of two) sorts
+    Morton keys once and reads every coarser scale off by bit shifts.
+    'bitmap' sets one bit per occupied cell while the grids fit in
+    memory_limit bytes (see BoxCounter) and uses keys beyond it.  'auto' picks 'dyadic' when the sizes allow it and 'keys' otherwise.
+    """
+    points = np.asarray(points)
+    if points.ndim == 1:
+        points = points[:, None]
+    if engine == 'auto':
+        engine = 'dyadic' if _dyadic_levels(box_sizes) is not None else 'keys'
+    if engine == 'dyadic' and _dyadic_levels(box_sizes) is None:
+        raise ValueError("the dyadic engine needs box sizes of the form finest * 2**k")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected 'auto' or one of {sorted(ENGINES)}.")
+    if len(points) == 0:
+        return [0] * len(box_sizes)
+    if engine == 'bitmap':
+        return _count_bitmap(points, box_sizes, memory_limit)
+    return ENGINES[engine](points, box_sizes)
+
+
+def _run_lengths(sorted_keys):
+    """Number of repeats of every distinct value of a sorted 1-D array."""
+    if len(sorted_keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1])))
+    return np.diff(np.append(starts, len(sorted_keys)))
+
+
+def _histogram_of_counts(box_counts):
+    """(counts, multiplicity): the distinct points-per-box values and how many boxes have each."""
+    multiplicity = np.bincount(box_counts)
+    counts = np.flatnonzero(multiplicity)
+    return counts, multiplicity[counts]
+
+
+def box_masses(points, box_sizes, engine='auto'):
+    """Points per occupied box at every scale, grouped by value.
+
+    Returns one (counts, multiplicity) pair per box size; multiplicity.sum()
+    is the box count.  Box masses take few distinct values, so everything
+    downstream works on these short arrays instead of one entry per box.
+    engine picks how boxes are grouped, as in box_counting: 'dyadic' shares
+    a single sort of Morton keys between the scales, 'keys' sorts (or
+    tallies) one int64 key per box at every scale and 'unique' sorts the
+    rows of box indices.  'auto' uses 'dyadic' when the sizes allow it and
+    'keys' otherwise.  'bitmap' only stores occupancy, not masses, so it
+    groups like 'keys'.
+    """
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 1:
+        points = points[:, None]
+    if engine != 'auto' and engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected 'auto' or one of {sorted(ENGINES)}.")
+    levels = _dyadic_levels(box_sizes)
+    if engine == 'dyadic' and levels is None:
+        raise ValueError("the dyadic engine needs box sizes of the form finest * 2**k")
+    if engine in ('auto', 'dyadic') and levels is not None:
+        boxes = _box_indices(points, np.min(box_sizes))
+        try:
+            keys = _morton_keys(boxes, int(levels.max()))
+        except OverflowError:
+            levels = None
+        else:
+            keys.sort()
+            d = boxes.shape[1]
+            return [_histogram_of_counts(_run_lengths(keys >> (d * int(k)))) for k in levels]
+    masses = []
+    for size in box_sizes:
+        if engine == 'unique':
+            _, box_counts = np.unique(_box_indices(points, size), axis=0, return_counts=True)
+            masses.append(_histogram_of_counts(box_counts))
+            continue
+        try:
+            keys, num_cells = _box_keys(points, size)
+        except OverflowError:
+            boxes = _box_indices(points, size)
+            boxes = boxes[np.lexsort(boxes.T[::-1])]
+            changes = (boxes[1:] != boxes[:-1]).any(axis=1)
+            box_counts = _run_lengths(np.concatenate(([0], np.cumsum(changes))))
+        else:
+            if num_cells <= 4 * len(keys):
+                box_counts = np.bincount(keys, minlength=num_cells)
+                box_counts = box_counts[box_counts > 0]
+            else:
+                keys.sort()
+                box_counts = _run_lengths(keys)
+        masses.append(_histogram_of_counts(box_counts))
+    return masses
+
+
+# Scales with fewer occupied boxes than this are too coarse to fit.
+MIN_BOXES = 30
+
+# Scales where more than this fraction of boxes hold a single point are too
+# fine for the number of points: many boxes have not been reached yet.
+MAX_SINGLETONS = 0.05
+
+# Bootstrap replicates behind the confidence interval of fractal_dimension.
+BOOTSTRAP = 200
+
+
+class DimensionEstimate(float):
+    """Box-counting dimension with a confidence interval and the scales fitted.
+
+    A float equal to the dimension, so arithmetic, comparisons and
+    formatting use it directly (and return plain floats); the extra
+    attributes are low and high, nan when no interval was computed, the
+    smallest and largest box sizes fitted, fit_min and fit_max, and the
+    number of scales fitted, num_scales.
+    """
+
+    __slots__ = ('low', 'high', 'fit_min', 'fit_max', 'num_scales')
+
+    def __new__(cls, dimension, low=np.nan, high=np.nan, fit_min=np.nan, fit_max=np.nan,
+                num_scales=0):
+        self = super().__new__(cls, dimension)
+        self.low = float(low)
+        self.high = float(high)
+        self.fit_min = float(fit_min)
+        self.fit_max = float(fit_max)
+        self.num_scales = int(num_scales)
+        return self
+
+    @property
+    def dimension(self):
+        return float(self)
+
+    def _asdict(self):
+        return {'dimension': float(self), 'low': self.low, 'high': self.high,
+                'fit_min': self.fit_min, 'fit_max': self.fit_max, 'num_scales': self.num_scales}
+
+    def __reduce__(self):
+        return (DimensionEstimate, tuple(self._asdict().values()))
+
+    def __repr__(self):
+        return (f"DimensionEstimate({float(self)!r}, low={self.low!r}, high={self.high!r}, "
+                f"fit_min={self.fit_min!r}, fit_max={self.fit_max!r}, "
+                f"num_scales={self.num_scales!r})")
+
+    @classmethod
+    def from_value(cls, value):
+        """An estimate from its _asdict() form, or from a bare dimension."""
+        if isinstance(value, dict):
+            return cls(**value)
+        return cls(float(value))
+
+
+def scaling_range(counts, singletons=None, min_boxes=MIN_BOXES, max_singletons=MAX_SINGLETONS):
+    """Boolean mask of the scales to fit, for scales in increasing box size.
+
+    A scale is usable when it has at least min_boxes occupied boxes and, if
+    the number of single-point boxes is known, at most max_singletons of
+    them are singletons.  The mask is the longest run of consecutive usable
+    scales.  With fewer than three usable scales (too few points for the
+    measure) it falls back to the three consecutive scales with at least
+    min_boxes boxes and the fewest singletons, or to all scales.
+    """
+    counts = np.asarray(counts)
+    usable = counts >= min_boxes
+    if singletons is not None:
+        usable &= np.asarray(singletons) <= max_singletons * counts
+    best, start = (0, 0), None
+    for i, ok in enumerate(np.append(usable, False)):
+        if ok and start is None:
+            start = i
+        elif not ok and start is not None:
+            if i - start > best[1] - best[0]:
+                best = (start, i)
+            start = None
+    mask = np.zeros(len(counts), dtype=bool)
+    mask[best[0]:best[1]] = True
+    if mask.sum() < 3:
+        mask[:] = len(counts) < 3
+        fraction = np.ones(len(counts)) if singletons is None else np.asarray(singletons) / counts
+        fraction = np.where(counts >= min_boxes, fraction, np.inf)
+        windows = [fraction[i:i + 3].sum() for i in range(len(counts) - 2)]
+        if windows and np.isfinite(min(windows)):
+            start = int(np.argmin(windows))
+            mask[start:start + 3] = True
+        else:
+            mask[:] = True
+    return mask
+
+
+def _slopes(log_sizes, log_counts, weights=None):
+    """Least-squares slope of every row of log_counts against log_sizes.
+
+    weights, one row per row of log_counts, weight the scales of each fit.
+    """
+    if weights is None:
+        weights = np.ones(log_counts.shape[-1])
+    total = weights.sum(axis=-1, keepdims=True)
+    x = log_sizes - (weights * log_sizes).sum(axis=-1, keepdims=True) / total
+    y = log_counts - (weights * log_counts).sum(axis=-1, keepdims=True) / total
+    return (weights * x * y).sum(axis=-1) / (weights * x * x).sum(axis=-1)
+
+
+def fractal_dimension(points, box_sizes=np.logspace(-4, 0, 30), engine='auto',
+                      bootstrap=BOOTSTRAP, confidence=0.95, seed=0,
+                      max_singletons=MAX_SINGLETONS):
+    """Box-counting dimension over the automatically chosen scaling range.
+
+    Scales that are too coarse (few boxes) or too fine for the number of
+    points (many single-point boxes) are left out of the fit; see
+    scaling_range.  The confidence interval is a bootstrap computed from the
+    one set of box masses, with no further passes over the points.  Points
+    are resampled Poisson-style (a box holding c points stays occupied with
+    probability 1 - exp(-c), so a replicate's counts are binomial draws over
+    the distinct box masses) and the fitted scales are resampled too, which
+    carries the scatter of the counts about the line, such as the lattice
+    oscillations of self-similar sets, into the interval.
+
+    Counts, singletons and masses all come from one box_masses pass, run
+    with the given engine; engines group the boxes identically, so the
+    estimate does not depend on it.  max_singletons=1 keeps fine scales however many
+    single-point boxes they have, for points that cover the set rather
+    than sample it.  bootstrap=0 skips the interval and leaves low
+    and high nan.  Returns a DimensionEstimate.
+    """
+    box_sizes = np.asarray(box_sizes, dtype=float)
+    order = np.argsort(box_sizes)
+    log_sizes = np.log(box_sizes[order])
+    masses = box_masses(points, box_sizes, engine)
+    masses = [masses[i] for i in order]
+    singletons = np.array([m[c == 1].sum() for c, m in masses])
+    counts = np.array([m.sum() for _, m in masses])
+    mask = scaling_range(counts, singletons, max_singletons=max_singletons)
+    dimension = -_slopes(log_sizes[mask], np.log(counts[mask]))
+    low = high = np.nan
+    if bootstrap > 0:
+        rng = np.random.default_rng(seed)
+        replicates = np.empty((bootstrap, mask.sum()))
+        for j, i in enumerate(np.flatnonzero(mask)):
+            c, m = masses[i]
+            replicates[:, j] = rng.binomial(m, -np.expm1(-c), size=(bootstrap, len(c))).sum(axis=1)
+        num_scales = int(mask.sum())
+        weights = rng.multinomial(num_scales, np.full(num_scales, 1 / num_scales), size=bootstrap)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spread = -_slopes(log_sizes[mask], np.log(np.maximum(replicates, 1)), weights)
+        # Replicates that drew a single scale have no slope; with a single
+        # fitted scale none has, and the interval stays nan.
+        spread = spread[np.isfinite(spread)]
+        if len(spread):
+            spread -= spread.mean()
+            tail = (1 - confidence) / 2
+            low = dimension + np.quantile(spread, tail)
+            high = dimension + np.quantile(spread, 1 - tail)
+    fitted = box_sizes[order][mask]
+    return DimensionEstimate(dimension, low, high, fitted.min(), fitted.max(), mask.sum())
+
+
+def _absolute_keys(points, size):
+    """int64 keys of the boxes containing points, independent of the batch.
+
+    Each of the d box coordinates is biased into 63 // d bits, so keys from
+    different batches can be compared directly.  Raises OverflowError when
+    a coordinate does not fit, as happens at fine scales in higher
+    dimensions.
+    """
+    d = points.shape[1]
+    bits = 63 // d
+    bias = 1 << (bits - 1)
+    keys = None
+    for j in range(d):
+        col = np.floor(points[:, j] / size).astype(np.int64)
+        if col.min() < -bias or col.max() >= bias:
+            raise OverflowError(f"points span too many boxes of size {size} for {d} dimensions")
+        col += bias
+        if keys is None:
+            keys = col
+        else:
+            keys <<= bits
+            keys |= col
+    return keys
+
+
+def _key_rows(keys, d):
+    """Box coordinates encoded by _absolute_keys, as an (n, d) int64 array."""
+    bits = 63 // d
+    bias = 1 << (bits - 1)
+    mask = (1 << bits) - 1
+    return np.stack([((keys >> (bits * (d - 1 - j))) & mask) - bias for j in range(d)], axis=1)
+
+
+def _merge_counts(keys, counts):
+    """Distinct keys in ascending order with their summed counts, capped at 2.
+
+    Only whether a box holds one point or more matters, so counts fit a uint8.
+    """
+    order = np.argsort(keys, kind='stable')
+    keys, counts = keys[order], counts[order]
+    if len(keys) == 0:
+        return keys, counts.astype(np.uint8)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    totals = np.add.reduceat(counts, starts, dtype=np.int64)
+    return keys[starts], np.minimum(totals, 2).astype(np.uint8)
+
+
+class _KeySet:
+    """Occupied boxes of one scale as a sorted array of distinct keys.
+
+    Each key carries whether its box holds one point or more, for the
+    singleton counts of scaling_range.  New keys are buffered and merged
+    once they outnumber the stored ones, which keeps the amortized cost of
+    add() proportional to the batch.
+    """
+
+    kind = 'keys'
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.multiplicity = np.empty(0, dtype=np.uint8)
+        self._pending = []
+        self._num_pending = 0
+
+    def add(self, keys):
+        keys = np.sort(keys)
+        runs = _run_lengths(keys)
+        keys = keys[np.cumsum(runs) - runs]
+        self._pending.append((keys, np.minimum(runs, 2).astype(np.uint8)))
+        self._num_pending += len(keys)
+        if self._num_pending > len(self.keys):
+            self._merge()
+
+    def _merge(self):
+        if self._pending:
+            self.keys, self.multiplicity = _merge_counts(
+                np.concatenate([self.keys] + [k for k, _ in self._pending]),
+                np.concatenate([self.multiplicity] + [c for _, c in self._pending]))
+            self._pending = []
+            self._num_pending = 0
+
+    def count(self):
+        self._merge()
+        return len(self.keys)
+
+    def singletons(self):
+        self._merge()
+        return int(np.count_nonzero(self.multiplicity == 1))
+
+    @property
+    def nbytes(self):
+        return (self.keys.nbytes + self.multiplicity.nbytes
+                + sum(k.nbytes + c.nbytes for k, c in self._pending))
+
+
+def _merge_rows(rows, counts):
+    """Distinct rows in lexicographic order with their summed counts, capped at 2."""
+    order = np.lexsort(rows.T[::-1])
+    rows, counts = rows[order], counts[order]
+    if len(rows) == 0:
+        return rows, counts.astype(np.uint8)
+    starts = np.flatnonzero(np.concatenate(([True], (rows[1:] != rows[:-1]).any(axis=1))))
+    totals = np.add.reduceat(counts, starts, dtype=np.int64)
+    return rows[starts], np.minimum(totals, 2).astype(np.uint8)
+
+
+class _RowSet(_KeySet):
+    """Occupied boxes of one scale as distinct rows of box coordinates.
+
+    Takes over from a _KeySet when box coordinates no longer fit one int64
+    key, sorting rows lexicographically the way _count_rows does.
+    """
+
+    kind = 'rows'
+
+    def __init__(self, d):
+        super().__init__()
+        self.keys = np.empty((0, d), dtype=np.int64)
+
+    @classmethod
+    def from_keys(cls, key_set, d):
+        """The boxes of a _KeySet over d dimensions, as rows."""
+        key_set._merge()
+        rows = cls(d)
+        rows.keys, rows.multiplicity = _key_rows(key_set.keys, d), key_set.multiplicity
+        return rows
+
+    def add(self, rows):
+        self._pending.append(_merge_rows(rows, np.ones(len(rows), dtype=np.uint8)))
+        self._num_pending += len(self._pending[-1][0])
+        if self._num_pending > len(self.keys):
+            self._merge()
+
+    def _merge(self):
+        if self._pending:
+            self.keys, self.multiplicity = _merge_rows(
+                np.concatenate([self.keys] + [k for k, _ in self._pending]),
+                np.concatenate([self.multiplicity] + [c for _, c in self._pending]))
+            self._pending = []
+            self._num_pending = 0
+
+
+# Set-bit count of every byte value, for numpy versions without bitwise_count.
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+    return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+class _Bitmap:
+    """Occupied boxes of one scale as a packed bit per cell of a fixed grid.
+
+    A second bitmap marks the cells holding more than one point, for the
+    singleton counts.  The grid covers the boxes of size `size` meeting the
+    bounds [lo, hi]; points outside it are rejected.
+    """
+
+    kind = 'bitmap'
+
+    def __init__(self, size, lo, hi):
+        self.size = size
+        self.first = np.floor(np.asarray(lo, dtype=float) / size).astype(np.int64)
+        self.extent = np.floor(np.asarray(hi, dtype=float) / size).astype(np.int64) - self.first + 1
+        self.bits = np.zeros((self.num_cells(self.size, lo, hi) + 7) // 8, dtype=np.uint8)
+        self.repeated = np.zeros_like(self.bits)
+
+    @staticmethod
+    def num_cells(size, lo, hi):
+        first = np.floor(np.asarray(lo, dtype=float) / size)
+        extent = np.floor(np.asarray(hi, dtype=float) / size) - first + 1
+        return int(np.prod([int(e) for e in extent], dtype=object))
+
+    def add_points(self, points):
+        index = None
+        for j in range(points.shape[1]):
+            col = np.floor(points[:, j] / self.size).astype(np.int64) - self.first[j]
+            if col.min() < 0 or col.max() >= self.extent[j]:
+                raise ValueError(f"points fall outside the bounds of the size {self.size} bitmap")
+            index = col if index is None else index * self.extent[j] + col
+        index.sort()
+        runs = _run_lengths(index)
+        index = index[np.cumsum(runs) - runs]
+        byte, bit = index >> 3, np.left_shift(1, index & 7).astype(np.uint8)
+        repeated = (runs > 1) | (self.bits[byte] & bit != 0)
+        np.bitwise_or.at(self.bits, byte, bit)
+        np.bitwise_or.at(self.repeated, byte[repeated], bit[repeated])
+
+    def count(self):
+        return _popcount(self.bits)
+
+    def singletons(self):
+        return self.count() - _popcount(self.repeated)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.repeated.nbytes
+
+
+class BoxCounter:
+    """Incremental box counting over points that arrive in batches.
+
+    Keeps the set of occupied boxes at every scale, so the counts and the
+    fitted dimension are available at any time without retaining points:
+
+        counter = BoxCounter()
+        for chunk in iter_chaos_game_triangle(10**8):
+            counter.add(chunk)
+            print(counter.num_points, counter.dimension())
+
+    Boxes holding a single point are tracked too, so the fit uses the same
+    scaling range as fractal_dimension and, once every point is added,
+    gives its estimate (without the interval, which needs box masses).
+
+    When bounds = (lo, hi) enclosing every point are given, scales whose
+    grid fits are stored as packed bitmaps (two bits per cell), coarsest
+    first, until their total would exceed memory_limit bytes; the remaining
+    fine scales fall back to sorted key arrays, or to sorted rows of box
+    coordinates once those no longer fit an int64 key (fine scales in five
+    or more dimensions).  memory_report() shows what each scale uses.
+    """
+
+    def __init__(self, box_sizes=np.logspace(-4, 0, 30), bounds=None,
+                 memory_limit=MEMORY_LIMIT):
+        self.box_sizes = np.asarray(box_sizes, dtype=float)
+        self.num_points = 0
+        self._scales = [_KeySet() for _ in self.box_sizes]
+        if bounds is not None:
+            lo, hi = bounds
+            budget = memory_limit
+            for i in np.argsort(-self.box_sizes):
+                size = self.box_sizes[i]
+                nbytes = 2 * ((_Bitmap.num_cells(size, lo, hi) + 7) // 8)
+                if nbytes > budget:
+                    break
+                self._scales[i] = _Bitmap(size, lo, hi)
+                budget -= nbytes
+
+    def add(self, points):
+        points = np.asarray(points, dtype=float)
+        if points.ndim == 1:
+            points = points[:, None]
+        if len(points) == 0:
+            return
+        for i, (size, scale) in enumerate(zip(self.box_sizes, self._scales)):
+            if isinstance(scale, _Bitmap):
+                scale.add_points(points)
+            elif isinstance(scale, _RowSet):
+                scale.add(_box_indices(points, size))
+            else:
+                try:
+                    scale.add(_absolute_keys(points, size))
+                except OverflowError:
+                    self._scales[i] = _RowSet.from_keys(scale, points.shape[1])
+                    self._scales[i].add(_box_indices(points, size))
+        self.num_points += len(points)
+
+    def counts(self):
+        return [scale.count() for scale in self._scales]
+
+    def singletons(self):
+        """Number of boxes holding exactly one point, at every scale."""
+        return [scale.singletons() for scale in self._scales]
+
+    def fit(self):
+        """Least-squares (slope, intercept) of log count against log box size.
+
+        Only the scales chosen by scaling_range from the box and singleton
+        counts are fitted.
+        """
+        if self.num_points == 0:
+            raise ValueError("no points have been added")
+        order = np.argsort(self.box_sizes)
+        counts = np.asarray(self.counts())[order]
+        mask = scaling_range(counts, np.asarray(self.singletons())[order])
+        return np.polyfit(np.log(self.box_sizes[order][mask]), np.log(counts[mask]), 1)
+
+    def dimension(self):
+        """Current box-counting dimension estimate, minus the fitted slope."""
+        return -self.fit()[0]
+
+    @property
+    def nbytes(self):
+        return sum(scale.nbytes for scale in self._scales)
+
+    def memory_report(self):
+        """Storage kind, bytes used and occupied count for every scale."""
+        return [{'box_size': float(size), 'kind': scale.kind,
+                 'nbytes': scale.nbytes, 'count': scale.count()}
+                for size, scale in zip(self.box_sizes, self._scales)]
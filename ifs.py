@@ -0,0 +1,358 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Number of steps the vectorized engine processes per block; bounds the
+# temporary arrays used by the prefix scan.
+BLOCK_SIZE = 1 << 16
+
+# Default number of points per chunk yielded by iter_chaos_game.
+CHUNK_SIZE = 1 << 20
+
+# Default number of initial steps each parallel walker discards.
+BURN_IN = 64
+
+
+class IFS:
+    """Iterated function system: maps x -> matrices[i] @ x + offsets[i], drawn with weights[i].
+
+    The maps are stored as contiguous (m, d, d) and (m, d) arrays so an
+    engine can gather a whole block of randomly chosen maps at once.  Maps
+    that are all scalar multiples of the identity (similitudes without
+    rotation, like the Sierpinski triangle) are detected and run through a
+    cheaper scalar update.
+    """
+
+    def __init__(self, matrices, offsets, weights=None):
+        self.matrices = np.ascontiguousarray(matrices, dtype=float)
+        self.offsets = np.ascontiguousarray(offsets, dtype=float)
+        m, d = self.offsets.shape
+        if self.matrices.shape != (m, d, d):
+            raise ValueError(f"matrices must have shape ({m}, {d}, {d}) to match the offsets.")
+        if weights is None:
+            weights = np.full(m, 1 / m)
+        self.weights = np.asarray(weights, dtype=float)
+        if self.weights.shape != (m,):
+            raise ValueError(f"weights must have one entry per map ({m}).")
+        total = self.weights.sum()
+        if not np.isclose(total, 1) and total > 0:
+            self.weights = self.weights / total
+        ratios = self.matrices[:, 0, 0]
+        scalar = np.all(self.matrices == ratios[:, None, None] * np.eye(d))
+        # Per-map contraction ratio when every map is a scalar matrix, else None.
+        self.ratios = ratios.copy() if scalar else None
+
+    @property
+    def dim(self):
+        return self.offsets.shape[1]
+
+    @property
+    def num_maps(self):
+        return self.offsets.shape[0]
+
+    def key(self):
+        """Hashable description of the maps and weights, for cache keys."""
+        return (tuple(self.matrices.ravel().tolist()), tuple(self.offsets.ravel().tolist()),
+                tuple(self.weights.tolist()))
+
+
+def _affine_scan(a, b):
+    """In-place inclusive prefix composition of the maps x -> a[i] * x + b[i].
+
+    Afterwards a[i], b[i] describe steps 0..i applied in order, so the point
+    after step i is a[i] * p0 + b[i].  Uses log2(n) doubling passes.
+    """
+    shift = 1
+    while shift < len(a):
+        b[shift:] += a[shift:, None] * b[:-shift]
+        a[shift:] *= a[:-shift]
+        shift *= 2
+
+
+def _matrix_scan(a, b):
+    """_affine_scan for maps x -> a[i] @ x + b[i] with (n, d, d) matrices."""
+    shift = 1
+    while shift < len(a):
+        b[shift:] += (a[shift:] @ b[:-shift, :, None])[..., 0]
+        a[shift:] = a[shift:] @ a[:-shift]
+        shift *= 2
+
+
+def _lane_steps(p, out, matrices, offsets, ind):
+    """Points after p under the maps ind[0], ind[1], ... for general matrices.
+
+    Composing d x d matrices in a full prefix scan costs d**3 operations per
+    step and pass, so the block is instead cut into about sqrt(n) lanes that
+    are advanced together, one step of every lane per numpy operation.  Each
+    lane's composite map is built first; a short scan over those gives the
+    point every lane starts from, and a second sweep fills in the points.
+    """
+    n, d = out.shape
+    lanes = max(1, min(n, int(np.sqrt(4 * n))))
+    length = -(-n // lanes)
+    # Pad the last lane with an identity map, index len(matrices).
+    padded = np.full(lanes * length, len(matrices), dtype=np.intp)
+    padded[:n] = ind
+    grid = padded.reshape(lanes, length).T
+    A = np.concatenate([matrices, np.eye(d)[None]])[grid]
+    b = np.concatenate([offsets, np.zeros((1, d))])[grid]
+
+    composite = np.broadcast_to(np.eye(d), (lanes, d, d)).copy()
+    shift = np.zeros((lanes, d))
+    for j in range(length):
+        shift = np.einsum('lij,lj->li', A[j], shift) + b[j]
+        composite = A[j] @ composite
+    _matrix_scan(composite, shift)
+
+    x = np.empty((lanes, d))
+    x[0] = p
+    x[1:] = composite[:-1] @ p + shift[:-1]
+    lane_points = np.empty((length, lanes, d))
+    for j in range(length):
+        x = np.einsum('lij,lj->li', A[j], x) + b[j]
+        lane_points[j] = x
+    out[:] = lane_points.transpose(1, 0, 2).reshape(-1, d)[:n]
+
+
+def _vectorized_steps(rng, p, out, ifs):
+    """Fill out with the points that follow p, a block of steps at a time."""
+    start = 0
+    while start < len(out):
+        stop = min(start + BLOCK_SIZE, len(out))
+        ind = rng.choice(ifs.num_maps, size=stop - start, p=ifs.weights)
+        if ifs.ratios is not None:
+            a = ifs.ratios[ind]
+            b = ifs.offsets[ind]
+            _affine_scan(a, b)
+            np.multiply(a[:, None], p, out=out[start:stop])
+            out[start:stop] += b
+        else:
+            _lane_steps(p, out[start:stop], ifs.matrices, ifs.offsets, ind)
+        p = out[stop - 1]
+        start = stop
+
+
+def _loop_steps(rng, p, out, ifs):
+    """Reference engine: one map draw and one update per step."""
+    for i in range(len(out)):
+        # Pick a random map based on the weights
+        ind = rng.choice(ifs.num_maps, p=ifs.weights)
+        if ifs.ratios is not None:
+            p = ifs.ratios[ind] * p + ifs.offsets[ind]
+        else:
+            p = ifs.matrices[ind] @ p + ifs.offsets[ind]
+        out[i] = p
+
+
+ENGINES = {
+    'vectorized': _vectorized_steps,
+    'loop': _loop_steps,
+}
+
+
+def make_rng(seed):
+    """The global np.random state when seed is None, else a Generator."""
+    return np.random if seed is None else np.random.default_rng(seed)
+
+
+def _iter_points(rng, ifs, num_points, engine, chunk_size, burn_in=0):
+    """Chunked trajectory driven by rng (a Generator or the np.random module)."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {sorted(ENGINES)}.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    steps = ENGINES[engine]
+
+    # Random initial point in the unit cube
+    p = rng.random(ifs.dim)
+    if burn_in > 0:
+        scratch = np.empty((burn_in, ifs.dim))
+        steps(rng, p, scratch, ifs)
+        p = scratch[-1]
+
+    done = 0
+    while done < num_points:
+        chunk = np.empty((min(chunk_size, num_points - done), ifs.dim))
+        if done == 0 and burn_in <= 0:
+            chunk[0] = p
+            steps(rng, p, chunk[1:], ifs)
+        else:
+            steps(rng, p, chunk, ifs)
+        p = chunk[-1].copy()
+        done += len(chunk)
+        yield chunk
+
+
+def iter_chaos_game(ifs, num_points, engine='vectorized', chunk_size=CHUNK_SIZE, seed=None):
+    """Yield the chaos-game trajectory of an IFS as consecutive (n, d) chunks.
+
+    The current point and RNG state carry over from one chunk to the next,
+    so concatenating the chunks gives the same trajectory as one long run.
+    seed may be anything np.random.default_rng accepts; None uses the global
+    state.
+    """
+    return _iter_points(make_rng(seed), ifs, int(num_points), engine, chunk_size)
+
+
+def _walker_points(rng, ifs, num_points, engine, chunk_size, burn_in):
+    """Trajectory of one independent walker, run inside a worker process."""
+    out = np.empty((num_points, ifs.dim))
+    done = 0
+    for chunk in _iter_points(rng, ifs, num_points, engine, chunk_size, burn_in):
+        out[done:done + len(chunk)] = chunk
+        done += len(chunk)
+    return out
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Process pools are kept alive between calls to avoid start-up cost.
+
+    Workers are started by a fork server (or spawned), never forked from
+    the caller, which may be a threaded web server; as with any such pool,
+    scripts using workers > 1 need an `if __name__ == '__main__':` guard.
+    """
+    with _pools_lock:
+        if workers not in _pools:
+            method = ('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                      else 'spawn')
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _pools[workers]
+
+
+def _parallel_points(out, ifs, workers, seed, engine, chunk_size, burn_in):
+    """Split the run over independent walkers and interleave their points.
+
+    Walker k supplies rows k, k + workers, k + 2 * workers, ... so every
+    prefix of the result mixes all walkers, as a single long run would.
+    """
+    rngs = np.random.default_rng(seed).spawn(workers)
+    pool = _get_pool(workers)
+    futures = [
+        pool.submit(_walker_points, rng, ifs, len(range(k, len(out), workers)),
+                    engine, chunk_size, burn_in)
+        for k, rng in enumerate(rngs)
+    ]
+    for k, future in enumerate(futures):
+        out[k::workers] = future.result()
+
+
+def chaos_game(ifs, num_points, engine='vectorized', chunk_size=CHUNK_SIZE, workers=None,
+               burn_in=BURN_IN, seed=None):
+    """Run the chaos game of an IFS and return the (num_points, d) trajectory.
+
+    With workers > 1 the run is split across that many independent walkers in
+    a process pool, each discarding burn_in initial steps.
+    """
+    num_points = int(num_points)
+    points = np.empty((num_points, ifs.dim))
+    if workers is not None and workers > 1:
+        _parallel_points(points, ifs, workers, seed, engine, chunk_size, burn_in)
+    else:
+        done = 0
+        for chunk in iter_chaos_game(ifs, num_points, engine=engine, chunk_size=chunk_size,
+                                     seed=seed):
+            points[done:done + len(chunk)] = chunk
+            done += len(chunk)
+    return points
+
+
+# Largest point set enumerate_attractor builds before it stops refining.
+MAX_POINTS = 1 << 24
+
+
+def _fixed_point(matrix, offset):
+    """Fixed point of x -> matrix @ x + offset, which lies on the attractor."""
+    return np.linalg.lstsq(np.eye(len(offset)) - matrix, offset, rcond=None)[0]
+
+
+def enumerate_attractor(ifs, depth, min_mass=0.0, resolution=0.0, max_points=MAX_POINTS):
+    """Sample the attractor deterministically by walking the address tree.
+
+    Level k holds the points f_w(x0) for the addresses w of length k, where
+    x0 is a fixed point of the first map; each level is the previous one
+    mapped by every map at once.  A branch stops once its cylinder is at most
+    resolution across (the bound uses the operator norms of the maps) and is
+    dropped when its mass, the product of the weights along w, is below
+    min_mass.  Refinement also stops at depth or when the next level would
+    exceed max_points.  Returns (points, mass) with the mass of every point's
+    cylinder, so the sample covers low-probability parts of the attractor as
+    densely as the rest while still carrying the invariant measure.
+    """
+    norms = np.linalg.norm(ifs.matrices, 2, axis=(1, 2))
+    x0 = _fixed_point(ifs.matrices[0], ifs.offsets[0])
+    # The attractor lies in the ball of this radius around x0 when every map contracts.
+    spread = np.linalg.norm(ifs.matrices @ x0 + ifs.offsets - x0, axis=1).max()
+    radius = spread / (1 - norms.max()) if norms.max() < 1 else np.inf
+
+    points = x0[None]
+    mass = np.ones(1)
+    size = np.full(1, 2 * radius)
+    kept = []
+    for _ in range(depth):
+        done = size <= resolution
+        kept.append((points[done], mass[done]))
+        points, mass, size = points[~done], mass[~done], size[~done]
+        if len(points) == 0 or (sum(len(k[0]) for k in kept) + len(points) * ifs.num_maps
+                                > max_points):
+            break
+        # Children i w: f_i(f_w(x0)), with mass p_i * p_w and size at most |A_i| size_w.
+        points = (points @ ifs.matrices.transpose(0, 2, 1) + ifs.offsets[:, None]).reshape(-1, ifs.dim)
+        mass = (ifs.weights[:, None] * mass).reshape(-1)
+        size = (norms[:, None] * size).reshape(-1)
+        heavy = (mass >= min_mass) & (mass > 0)
+        points, mass, size = points[heavy], mass[heavy], size[heavy]
+    kept.append((points, mass))
+    return (np.concatenate([k[0] for k in kept]), np.concatenate([k[1] for k in kept]))
+
+
+# Presets
+
+def similitudes(ratios, fixed_points, weights=None):
+    """IFS of maps x -> r_i * x + (1 - r_i) * v_i contracting towards points v_i."""
+    ratios = np.asarray(ratios, dtype=float)
+    fixed_points = np.asarray(fixed_points, dtype=float)
+    d = fixed_points.shape[1]
+    return IFS(ratios[:, None, None] * np.eye(d), (1 - ratios)[:, None] * fixed_points, weights)
+
+
+TRIANGLE_VERTICES = np.array([[0, 0], [0, 1], [1, 0]], dtype=float)
+
+
+def sierpinski_triangle(p1=1/3.0, p2=1/3.0, r1=1/2, r2=1/2, r3=1/2):
+    """The app's triangle: vertices (0, 0), (0, 1), (1, 0), probabilities p1, p2, 1 - p1 - p2."""
+    return similitudes([r1, r2, r3], TRIANGLE_VERTICES, [p1, p2, 1 - p1 - p2])
+
+
+def sierpinski_simplex(dim=3, ratios=1/2, weights=None):
+    """Maps towards the vertices 0, e_1, ..., e_dim of the unit simplex.
+
+    dim=2 is the triangle and dim=3 the Sierpinski pyramid (tetrahedron).
+    ratios is one ratio for every map or one per vertex.
+    """
+    vertices = np.vstack([np.zeros(dim), np.eye(dim)])
+    return similitudes(np.broadcast_to(ratios, dim + 1), vertices, weights)
+
+
+def sierpinski_carpet():
+    """Eight maps of ratio 1/3 onto the unit square minus its middle ninth."""
+    corners = [(i / 2, j / 2) for i in range(3) for j in range(3) if (i, j) != (1, 1)]
+    return similitudes(np.full(8, 1 / 3), corners)
+
+
+def barnsley_fern():
+    """Barnsley's fern: four non-uniform affine maps with the classic weights."""
+    return IFS(
+        [[[0.0, 0.0], [0.0, 0.16]],
+         [[0.85, 0.04], [-0.04, 0.85]],
+         [[0.2, -0.26], [0.23, 0.22]],
+         [[-0.15, 0.28], [0.26, 0.24]]],
+        [[0.0, 0.0], [0.0, 1.6], [0.0, 1.6], [0.0, 0.44]],
+        [0.01, 0.85, 0.07, 0.07],
+    )
@@ -1,3 +1,90 @@
-from app import server
+"""Production entry point: a WSGI callable that builds the Dash app lazily.
 
-app = server
+Importing this module costs almost nothing.  A background thread imports
+app (dash, plotly, numpy and the figure code) and warms it up by building
+the default figure and serving the page shell once.  A request arriving
+before the import finishes waits for it; one arriving during the warm-up
+is served straight away, computing whatever it needs itself.  Timings go to the 'index' logger, with
+a warning when the app takes longer than CHAOS_COLD_START_TARGET seconds
+(default 2) to become ready.  CHAOS_WARM=0 skips the warm-up, so the app
+is imported by the first request instead.
+
+    python index.py    # measure a cold start; exits 1 if over the target
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COLD_START_TARGET = float(os.environ.get('CHAOS_COLD_START_TARGET', '2'))
+
+# Requests made by the warm-up, so the first visitor finds them compiled.
+WARM_PATHS = ('/', '/_dash-layout', '/_dash-dependencies')
+
+
+class LazyApp:
+    """WSGI application that imports and warms the Dash server on first use."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self._server = None
+        self._lock = threading.Lock()
+        self._first_request = True
+
+    def load(self):
+        """The Flask server of app, importing it on the first call."""
+        with self._lock:
+            if self._server is None:
+                start = time.perf_counter()
+                from app import server
+                self.timings['import'] = time.perf_counter() - start
+                logger.info("imported app in %.3fs", self.timings['import'])
+                self._server = server
+        return self._server
+
+    def warm(self):
+        """Import the app, build the default figure and serve the page shell once."""
+        server = self.load()
+        start = time.perf_counter()
+        from app import warm_up
+        warm_up()
+        client = server.test_client()
+        for path in WARM_PATHS:
+            client.get(path)
+        self.timings['warm'] = time.perf_counter() - start
+        self.timings['ready'] = time.perf_counter() - self.started
+        logger.info("warmed up in %.3fs, ready %.3fs after start",
+                    self.timings['warm'], self.timings['ready'])
+        if self.timings['ready'] > COLD_START_TARGET:
+            logger.warning("cold start took %.3fs, over the %.1fs target",
+                           self.timings['ready'], COLD_START_TARGET)
+
+    def __call__(self, environ, start_response):
+        server = self._server or self.load()
+        if self._first_request:
+            self._first_request = False
+            self.timings['first_request'] = time.perf_counter() - self.started
+            logger.info("first request %.3fs after start", self.timings['first_request'])
+        return server(environ, start_response)
+
+
+app = LazyApp()
+
+warm_thread = None
+if os.environ.get('CHAOS_WARM', '1') != '0':
+    warm_thread = threading.Thread(target=app.warm, name='warm-up', daemon=True)
+    warm_thread.start()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if warm_thread is None:
+        app.warm()
+    else:
+        warm_thread.join()
+    print(', '.join(f"{name} {seconds:.3f}s" for name, seconds in app.timings.items()))
+    sys.exit(0 if app.timings['ready'] <= COLD_START_TARGET else 1)
@@ -0,0 +1,107 @@
+"""Generalized dimensions D_q and the f(alpha) spectrum of chaos-game measures.
+
+With non-uniform probabilities the chaos game samples a multifractal
+measure: boxes of size e carry mass mu ~ e**alpha with a whole range of
+alpha.  The spectrum is estimated from box masses (point counts) with the
+Chhabra-Jensen method, which gives tau(q), D_q, alpha(q) and f(alpha(q))
+as slopes against log e for every q at once:
+
+    spectrum = multifractal_spectrum(points, q=np.linspace(-5, 5, 41))
+
+and compared against the exact values for self-similar measures from
+similarity_spectrum(q, ratios, probabilities).
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from critexp import similarity_dimension
+from fracdim import box_masses, dyadic_box_sizes
+from ifs import BURN_IN
+
+# Default q values of a spectrum.
+DEFAULT_Q = np.linspace(-5, 5, 21)
+
+# Default box sizes: dyadic, and coarse enough that boxes of a 10**6 point
+# run of the triangle hold many points each.
+DEFAULT_BOX_SIZES = dyadic_box_sizes(2.0**-9, 7)
+
+
+class Spectrum(NamedTuple):
+    """Multifractal spectrum; every field is an array over q.
+
+    tau(q) is the mass exponent, D = tau / (q - 1) the generalized
+    dimensions (D_1 is the information dimension), and (alpha, f) trace
+    the f(alpha) curve, f = q * alpha - tau.
+    """
+    q: np.ndarray
+    tau: np.ndarray
+    D: np.ndarray
+    alpha: np.ndarray
+    f: np.ndarray
+
+
+def _slopes(log_sizes, values):
+    """Least-squares slope of every column of values (scales x q) against log_sizes."""
+    x = log_sizes - log_sizes.mean()
+    return x @ (values - values.mean(axis=0)) / (x @ x)
+
+
+def multifractal_spectrum(points, q=DEFAULT_Q, box_sizes=DEFAULT_BOX_SIZES, burn_in=BURN_IN):
+    """Chhabra-Jensen estimate of the spectrum of the measure sampled by points.
+
+    For every scale the box masses mu_i give Z(q) = sum_i mu_i**q and the
+    averages A(q) = sum_i w_i log mu_i and F(q) = sum_i w_i log w_i under the
+    weights w_i = mu_i**q / Z(q); tau, alpha and f are the slopes of log Z, A
+    and F against log e.  Work per scale is one (len(q), distinct masses)
+    array, so the whole spectrum costs about one box count.
+
+    The first burn_in points are skipped: the walk starts off the attractor,
+    and for q < 0 the near-empty boxes those few points fall in would
+    dominate every sum.
+    """
+    q = np.atleast_1d(np.asarray(q, dtype=float))
+    points = points[burn_in:]
+    num_points = len(points)
+    if num_points == 0:
+        raise ValueError("no points to estimate a spectrum from")
+    log_z, mean_log_mu = [], []
+    for counts, multiplicity in box_masses(points, box_sizes):
+        log_mu = np.log(counts / num_points)
+        exponents = q[:, None] * log_mu + np.log(multiplicity)
+        top = exponents.max(axis=1, keepdims=True)
+        weights = np.exp(exponents - top)
+        total = weights.sum(axis=1)
+        log_z.append(top[:, 0] + np.log(total))
+        mean_log_mu.append(weights @ log_mu / total)
+    log_z, mean_log_mu = np.array(log_z), np.array(mean_log_mu)
+    log_sizes = np.log(np.asarray(box_sizes, dtype=float))
+    tau = _slopes(log_sizes, log_z)
+    alpha = _slopes(log_sizes, mean_log_mu)
+    f = _slopes(log_sizes, q * mean_log_mu - log_z)
+    return Spectrum(q, tau, _dimensions(q, tau, alpha), alpha, f)
+
+
+def _dimensions(q, tau, alpha):
+    """D_q = tau / (q - 1), with the information dimension alpha(1) at q = 1."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(q == 1, alpha, tau / (q - 1))
+
+
+def similarity_spectrum(q, ratios, probabilities):
+    """Exact spectrum of the self-similar measure with the given ratios and probabilities.
+
+    tau(q) solves sum_i p_i**q r_i**-tau = 1 (critexp.similarity_dimension
+    with weights p_i**q) and alpha = dtau/dq follows by implicit
+    differentiation.  Assumes the open set condition, as the similarity
+    dimension does; maps of probability 0 carry no mass and are ignored.
+    """
+    q = np.atleast_1d(np.asarray(q, dtype=float))
+    ratios = np.asarray(ratios, dtype=float)
+    probabilities = np.asarray(probabilities, dtype=float)
+    used = probabilities > 0
+    ratios, probabilities = ratios[used], probabilities[used]
+    tau = -similarity_dimension(ratios, probabilities ** q[:, None])
+    terms = probabilities ** q[:, None] * ratios ** -tau[:, None]
+    alpha = (terms @ np.log(probabilities)) / (terms @ np.log(ratios))
+    return Spectrum(q, tau, _dimensions(q, tau, alpha), alpha, q * alpha - tau)
@@ -0,0 +1,170 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Axis range shown by the app for the unit triangle.
+EXTENT = ((-0.1, 1.1), (-0.1, 1.1))
+
+# Axis ranges of 3D views of the unit simplex.
+EXTENT3 = ((-0.1, 1.1), (-0.1, 1.1), (-0.1, 1.1))
+
+# Colors of the density image, from sparse to dense; empty pixels are transparent.
+DENSITY_COLORS = ['#c6dbef', '#6baed6', '#2171b5', '#08306b']
+
+
+def histogram(x, y, bins=600, extent=EXTENT):
+    """Point counts on a bins x bins grid over extent, indexed [row (y), column (x)].
+
+    Points outside extent are dropped.  Uses one bincount pass, which is
+    considerably faster than np.histogram2d.
+    """
+    (x0, x1), (y0, y1) = extent
+    col = np.floor((np.asarray(x) - x0) * (bins / (x1 - x0))).astype(np.int64)
+    row = np.floor((np.asarray(y) - y0) * (bins / (y1 - y0))).astype(np.int64)
+    inside = (col >= 0) & (col < bins) & (row >= 0) & (row < bins)
+    flat = row[inside] * bins + col[inside]
+    return np.bincount(flat, minlength=bins * bins).reshape(bins, bins)
+
+
+def voxel_counts(points, bins=48, extent=EXTENT3):
+    """Point counts on a bins**d grid over extent, indexed [x, y, z, ...].
+
+    The d-dimensional analogue of histogram; points outside are dropped.
+    """
+    points = np.asarray(points)
+    flat = np.zeros(len(points), dtype=np.int64)
+    inside = np.ones(len(points), dtype=bool)
+    for j, (lo, hi) in enumerate(extent):
+        cell = np.floor((points[:, j] - lo) * (bins / (hi - lo))).astype(np.int64)
+        inside &= (cell >= 0) & (cell < bins)
+        flat = flat * bins + cell
+    return np.bincount(flat[inside], minlength=bins ** len(extent)).reshape((bins,) * len(extent))
+
+
+def scale_counts(counts, scale='log'):
+    """Map counts to uint8 levels 1..255 for occupied pixels, 0 for empty ones.
+
+    scale is 'log' (log of the count), 'eq' (histogram equalization: the rank
+    of the count among occupied pixels) or 'linear'.
+    """
+    occupied = counts > 0
+    levels = np.zeros(counts.shape, dtype=np.uint8)
+    if not occupied.any():
+        return levels
+    values = counts[occupied].astype(float)
+    if scale == 'log':
+        values = np.log(values)
+    elif scale == 'eq':
+        distinct = np.unique(values)
+        values = np.searchsorted(distinct, values).astype(float)
+    elif scale != 'linear':
+        raise ValueError(f"Unknown scale {scale!r}; expected 'log', 'eq' or 'linear'.")
+    lo, hi = values.min(), values.max()
+    span = hi - lo if hi > lo else 1.0
+    levels[occupied] = 1 + np.round((values - lo) / span * 254).astype(np.uint8)
+    return levels
+
+
+def _colorscale():
+    """Colorscale mapping level 0 to transparent and 1..255 across DENSITY_COLORS."""
+    scale = [[0.0, 'rgba(0,0,0,0)'], [0.5 / 255, 'rgba(0,0,0,0)']]
+    stops = np.linspace(1 / 255, 1, len(DENSITY_COLORS))
+    return scale + [[float(s), c] for s, c in zip(stops, DENSITY_COLORS)]
+
+
+def density_trace(levels, extent=EXTENT, **kwargs):
+    """Heatmap trace drawing an image of uint8 levels over extent."""
+    (x0, x1), (y0, y1) = extent
+    ny, nx = levels.shape
+    return go.Heatmap(
+        z=levels,
+        x0=x0 + (x1 - x0) / (2 * nx), dx=(x1 - x0) / nx,
+        y0=y0 + (y1 - y0) / (2 * ny), dy=(y1 - y0) / ny,
+        zmin=0, zmax=255,
+        colorscale=_colorscale(),
+        showscale=False,
+        hoverinfo='skip',
+        **kwargs
+    )
+
+
+def density_figure(x, y, bins=600, extent=EXTENT, scale='log'):
+    """Figure showing the points as a density image rather than markers.
+
+    The payload is bins**2 bytes however many points there are.
+    """
+    return counts_figure(histogram(x, y, bins, extent), extent, scale)
+
+
+def counts_figure(counts, extent=EXTENT, scale='log'):
+    """Density figure from a histogram, e.g. one accumulated chunk by chunk."""
+    levels = scale_counts(counts, scale)
+    (x0, x1), (y0, y1) = extent
+    return go.Figure(
+        data=[density_trace(levels, extent)],
+        layout=go.Layout(
+            xaxis=dict(range=[x0, x1]),
+            yaxis=dict(range=[y0, y1]),
+        )
+    )
+
+
+# Coordinate encodings accepted by encode_axis.
+PRECISIONS = ('float64', 'float32', 'uint16')
+
+
+def encode_axis(values, view=EXTENT[0], precision='float32', nticks=7):
+    """Compact encoding of one coordinate array plus the matching axis settings.
+
+    Plotly (>= 6) ships numpy arrays as base64 typed arrays, so the payload
+    is set by the dtype: 'float64' (8 bytes per value), 'float32' (4) or
+    'uint16' (2).  'uint16' quantizes values to 65536 levels over the union
+    of view and the data range; the axis then runs in level units, with tick
+    labels giving the original coordinates.  Returns (encoded, axis dict).
+    """
+    lo, hi = view
+    if precision == 'float64':
+        return np.asarray(values, dtype=np.float64), dict(range=[lo, hi])
+    if precision == 'float32':
+        return np.asarray(values, dtype=np.float32), dict(range=[lo, hi])
+    if precision != 'uint16':
+        raise ValueError(f"Unknown precision {precision!r}; expected 'float64', 'float32' or 'uint16'.")
+    values = np.asarray(values, dtype=float)
+    q0 = min(lo, values.min()) if len(values) else lo
+    q1 = max(hi, values.max()) if len(values) else hi
+    step = (q1 - q0) / 65535 if q1 > q0 else 1.0
+    encoded = np.round((values - q0) / step).astype(np.uint16)
+    ticks = np.linspace(lo, hi, nticks)
+    return encoded, dict(range=[(lo - q0) / step, (hi - q0) / step],
+                         tickvals=list((ticks - q0) / step),
+                         ticktext=[f"{t:.2f}" for t in ticks])
+
+
+def volume_figure(counts, extent=EXTENT3, scale='log'):
+    """3D density figure from voxel counts, drawn as a translucent go.Volume.
+
+    The browser receives one uint8 level per voxel (plus float32 voxel
+    centres) instead of one Scatter3d marker per point.
+    """
+    levels = scale_counts(counts, scale)
+    centres = [np.linspace(lo, hi, n, endpoint=False, dtype=np.float32) + np.float32((hi - lo) / (2 * n))
+               for (lo, hi), n in zip(extent, counts.shape)]
+    x, y, z = np.meshgrid(*centres, indexing='ij')
+    return go.Figure(
+        data=[go.Volume(
+            x=x.ravel(), y=y.ravel(), z=z.ravel(),
+            value=levels.ravel(),
+            isomin=1, isomax=255,
+            opacity=0.15,
+            surface_count=12,
+            colorscale=[[float(s), c] for s, c in
+                        zip(np.linspace(0, 1, len(DENSITY_COLORS)), DENSITY_COLORS)],
+            showscale=False,
+            hoverinfo='skip',
+        )],
+        layout=go.Layout(scene=dict(
+            xaxis=dict(range=list(extent[0])),
+            yaxis=dict(range=list(extent[1])),
+            zaxis=dict(range=list(extent[2])),
+            aspectmode='cube',
+        ))
+    )
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from cache import atomic_write, evict_files, file_entries, touch
+
+
+class PointStore:
+    """Content-addressed directory of point clouds shared between processes.
+
+    Each entry is a .npy array plus a .json sidecar holding its metadata,
+    stored under a name derived from the key.  Arrays are opened as
+    read-only memory maps, so reads are zero-copy and the page cache is
+    shared by every process on the host.  Writes are atomic renames; once
+    the directory exceeds quota_bytes the least recently read entries are
+    removed.
+    """
+
+    def __init__(self, root, quota_bytes=2 * 2**30):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, key):
+        """Return (memmap, metadata) for key, or None if it is not stored."""
+        path = self._path(key)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            points = np.load(path + '.npy', mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        # Reads refresh the modification time, which drives eviction.
+        touch(path + '.npy')
+        return points, meta
+
+    def put(self, key, points, meta):
+        """Store points with JSON-serializable meta and enforce the quota."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path + '.npy', lambda f: np.save(f, np.ascontiguousarray(points)))
+        atomic_write(path + '.json', lambda f: f.write(json.dumps(meta).encode()))
+        self.evict()
+
+    def entries(self):
+        """List (mtime, size, path) for every stored array."""
+        return file_entries(self.root, '.npy')
+
+    def evict(self):
+        """Remove least recently used entries until within quota."""
+        evict_files(self.root, ('.npy', '.json'), self.quota_bytes)
+
+
+_default_store = None
+
+
+def get_default_store():
+    """The store configured by CHAOS_STORE_DIR (and CHAOS_STORE_QUOTA), if any.
+
+    With a disk or sqlite cache backend (CHAOS_CACHE_BACKEND) the store
+    defaults to the points directory under CHAOS_CACHE_DIR: it is the disk
+    layer for point arrays.
+    """
+    global _default_store
+    root = os.environ.get('CHAOS_STORE_DIR')
+    if not root and os.environ.get('CHAOS_CACHE_BACKEND', 'memory') != 'memory':
+        root = os.path.join(os.environ.get('CHAOS_CACHE_DIR', './.cache'), 'points')
+    if not root:
+        return None
+    if _default_store is None or _default_store.root != root:
+        quota = int(os.environ.get('CHAOS_STORE_QUOTA', 2 * 2**30))
+        _default_store = PointStore(root, quota)
+    return _default_store
@@ -0,0 +1,151 @@
+"""Parameter sweeps of the chaos game over grids of (p1, p2, r1, r2, r3).
+
+Every grid cell gets a box-dimension estimate from a seeded chaos-game run
+and the similarity dimension of its ratios.  Rows are appended to a CSV file
+as cells finish, so an interrupted sweep resumes where it stopped:
+
+    python sweep.py --num-points 100000 --r1 0.3:0.7:5 --r2 0.3:0.7:5 --out sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from chaos_game import iter_chaos_game_triangle
+from critexp import similarity_dimension
+from fracdim import fractal_dimension
+
+PARAMS = ('p1', 'p2', 'r1', 'r2', 'r3')
+DEFAULTS = {'p1': 1/3.0, 'p2': 1/3.0, 'r1': 1/2, 'r2': 1/2, 'r3': 1/2}
+COLUMNS = ('index', 'num_points') + PARAMS + (
+    'seed', 'box_dimension', 'similarity_dimension', 'generate_seconds', 'fit_seconds')
+
+
+def parse_values(text):
+    """'a:b:n' gives n evenly spaced values from a to b; 'x,y,z' lists values."""
+    if ':' in text:
+        start, stop, num = text.split(':')
+        return list(np.linspace(float(start), float(stop), int(num)))
+    return [float(v) for v in text.split(',')]
+
+
+def grid_cells(grid):
+    """All combinations of the grid values, skipping cells with p1 + p2 > 1."""
+    values = [grid.get(name, [DEFAULTS[name]]) for name in PARAMS]
+    cells = []
+    for combo in itertools.product(*values):
+        cell = dict(zip(PARAMS, (float(v) for v in combo)))
+        if cell['p1'] + cell['p2'] <= 1:
+            cells.append(cell)
+    return cells
+
+
+def cell_seed(seed, index):
+    """Independent, reproducible seed for one cell of a sweep."""
+    return int(np.random.SeedSequence([seed, index]).generate_state(1)[0])
+
+
+def run_cell(index, num_points, cell, seed):
+    """Generate one cell's points and fit their box dimension."""
+    start = time.perf_counter()
+    points = np.empty((num_points, 2))
+    done = 0
+    for chunk in iter_chaos_game_triangle(num_points, seed=seed, **cell):
+        points[done:done + len(chunk)] = chunk
+        done += len(chunk)
+    generated = time.perf_counter()
+    fd = fractal_dimension(points)
+    fitted = time.perf_counter()
+    return {'index': index, 'num_points': num_points, **cell, 'seed': seed,
+            'box_dimension': float(fd),
+            'generate_seconds': generated - start,
+            'fit_seconds': fitted - generated}
+
+
+def completed_indices(path, cells, num_points):
+    """Indices of the cells whose results are already in the file at path.
+
+    Rows only count if they match the cell's parameters, so a file from a
+    different grid is never mistaken for progress.  A trailing partial line
+    left by an interrupted run is truncated away.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    done = set()
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                index = int(row['index'])
+                cell = cells[index]
+                if (int(row['num_points']) == num_points
+                        and all(float(row[name]) == cell[name] for name in PARAMS)):
+                    done.add(index)
+            except (IndexError, KeyError, TypeError, ValueError):
+                continue
+    return done
+
+
+def run_sweep(grid, num_points, out, workers=None, seed=0):
+    """Run every cell of grid not yet in out, appending one CSV row per cell.
+
+    At most two cells per worker are in flight, so memory stays bounded by
+    a few point clouds regardless of the grid size.  Returns the number of
+    cells computed.
+    """
+    cells = grid_cells(grid)
+    sim = similarity_dimension([[c['r1'], c['r2'], c['r3']] for c in cells]) if cells else []
+    done = completed_indices(out, cells, num_points)
+    todo = [i for i in range(len(cells)) if i not in done]
+    if not todo:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    new_file = not os.path.exists(out) or os.path.getsize(out) == 0
+    with open(out, 'a', newline='') as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new_file:
+            writer.writeheader()
+        pending = set()
+        queue = iter(todo)
+        limit = 2 * workers
+        while True:
+            for i in itertools.islice(queue, limit - len(pending)):
+                pending.add(pool.submit(run_cell, i, num_points, cells[i], cell_seed(seed, i)))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                row = future.result()
+                row['similarity_dimension'] = sim[row['index']]
+                writer.writerow(row)
+            f.flush()
+    return len(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-points', type=int, default=100000)
+    for name in PARAMS:
+        parser.add_argument(f'--{name}', type=parse_values, default=None,
+                            help="values as start:stop:num or a comma-separated list")
+    parser.add_argument('--out', default='sweep.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    grid = {name: getattr(args, name) for name in PARAMS if getattr(args, name) is not None}
+    start = time.perf_counter()
+    count = run_sweep(grid, args.num_points, args.out, workers=args.workers, seed=args.seed)
+    print(f"{count} cells computed in {time.perf_counter() - start:.1f}s, results in {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Request normalisation of the Dash app: URL queries to run parameters.
+
+    python -m pytest -q test_app.py
+"""
+import os
+
+import pytest
+
+# Synchronous callbacks and in-process caches, whatever is installed.
+os.environ.setdefault('CHAOS_BACKGROUND', '0')
+os.environ.setdefault('CHAOS_CACHE_BACKEND', 'memory')
+
+import app  # noqa: E402
+
+INPUTS = [app.DEFAULT_PARAMS[k] for k in
+          ('num_points', 'p1', 'p2', 'r1', 'r2', 'r3', 'render', 'shape')]
+
+
+def params(query):
+    return app.request_params(query, *INPUTS)
+
+
+def test_inputs_without_query():
+    assert params('') == dict(app.DEFAULT_PARAMS, seed=app.DEFAULT_SEED)
+
+
+def test_query_overrides_inputs():
+    p = params('?num_points=5000&r1=0.4&seed=12&render=density&precision=uint16')
+    assert (p['num_points'], p['r1'], p['seed'], p['render'], p['precision']) == (
+        5000, 0.4, 12, 'density', 'uint16')
+
+
+@pytest.mark.parametrize('query', ['?precision=float16', '?seed=abc', '?seed=-3', '?seed=1.5',
+                                   '?render=foo', '?shape=foo'])
+def test_malformed_values_fall_back_to_defaults(query):
+    assert params(query) == params('')
+
+
+def test_pyramid_ignores_the_triangle_inputs():
+    a = params('?shape=pyramid&r1=0.4&p1=0.1&p2=0.7&r2=0.9&r3=0.2')
+    b = params('?shape=pyramid&r1=0.4')
+    assert a == b
+    assert (a['p1'], a['p2'], a['r2'], a['r3']) == (0.25, 0.25, 0.4, 0.4)
+    assert app.response_key(a) == app.response_key(b)
+
+
+def test_pyramid_table_shows_only_its_parameters():
+    rows = app.parameter_rows(params('?shape=pyramid&r1=0.4'))
+    assert [row['param'] for row in rows] == ['N points', 'r (every map)', 'p (every map)']
+    assert len(app.parameter_rows(params(''))) == 6
+
+
+def test_runs_without_a_seed_use_the_default_seed():
+    assert params('?num_points=5000')['seed'] == app.DEFAULT_SEED
+
+
+def test_response_key_ignores_number_spelling():
+    assert (app.response_key(params('?num_points=10000&r1=0.5'))
+            == app.response_key(params('?num_points=10000.0&r1=.50')))
+    assert app.response_key(params('?seed=1')) != app.response_key(params('?seed=2'))
+
+
+def test_response_key_carries_the_version(monkeypatch):
+    key = app.response_key(params(''))
+    monkeypatch.setattr(app, 'RESPONSE_VERSION', app.RESPONSE_VERSION + 1)
+    assert app.response_key(params('')) != key
+
+
+def test_prewarm_fills_the_response_cache(monkeypatch):
+    monkeypatch.setattr(app, 'response_cache', app.make_cache('responses', 2**24, 'memory'))
+    app.prewarm(['?num_points=2000&seed=4'])
+    assert app.response_key(params('')) in app.response_cache
+    assert app.response_key(params('?num_points=2000&seed=4')) in app.response_cache
@@ -0,0 +1,152 @@
+"""Result caches: size bounds, least-recently-used eviction and time to live.
+
+    python -m pytest -q test_cache.py
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+import cache
+from cache import DiskCache, LRUCache, SQLiteCache, make_cache
+from chaos_game import chaos_game_triangle, result_cache
+
+
+def array(kib):
+    return np.zeros(kib * 128)
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_bytes=3 * 1024)
+    for key in 'abc':
+        lru.set(key, array(1))
+    lru.get('a')
+    lru.set('d', array(1))
+    assert 'b' not in lru and all(key in lru for key in 'acd')
+    assert lru.nbytes == 3 * 1024
+
+
+def test_lru_skips_entries_larger_than_the_cache():
+    lru = LRUCache(max_bytes=1024)
+    lru.set('a', array(1))
+    lru.set('b', array(2))
+    assert 'b' not in lru and 'a' in lru
+
+
+def test_lru_replacing_a_key_updates_its_size():
+    lru = LRUCache(max_bytes=4 * 1024)
+    lru.set('a', array(1))
+    lru.set('a', array(3))
+    assert len(lru) == 1 and lru.nbytes == 3 * 1024
+
+
+def test_lru_stats_count_hits_and_misses():
+    lru = LRUCache(max_bytes=1024)
+    lru.set('a', 1)
+    lru.get('a'), lru.get('b'), lru.get('b')
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+
+def test_lru_ttl_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    lru = LRUCache(max_bytes=1024, ttl=10)
+    lru.set('a', 1)
+    now[0] += 9
+    assert lru.get('a') == 1
+    now[0] += 2
+    assert lru.get('a') is None and len(lru) == 0 and lru.nbytes == 0
+
+
+def test_seeded_runs_are_cached_read_only():
+    result_cache.clear()
+    points, fd = chaos_game_triangle(5000, seed=3, indexed=False)
+    again, fd_again = chaos_game_triangle(5000, seed=3, indexed=False)
+    assert again is points and fd_again == fd
+    assert not points.flags.writeable
+    other, _ = chaos_game_triangle(5000, seed=4, indexed=False)
+    assert not np.array_equal(other, points)
+
+
+def test_unseeded_runs_are_not_cached():
+    result_cache.clear()
+    chaos_game_triangle(5000, indexed=False)
+    assert len(result_cache) == 0
+
+
+@pytest.fixture(params=['disk', 'sqlite'])
+def shared(request, tmp_path):
+    """A disk or sqlite cache and a factory opening it again, as another process would."""
+    if request.param == 'disk':
+        def open_cache(max_bytes=10**6, ttl=None):
+            return DiskCache(str(tmp_path / 'figures'), max_bytes, ttl)
+    else:
+        def open_cache(max_bytes=10**6, ttl=None):
+            return SQLiteCache(str(tmp_path / 'cache.sqlite'), 'figures', max_bytes, ttl)
+    return open_cache
+
+
+def test_shared_caches_round_trip_between_instances(shared):
+    writer, reader = shared(), shared()
+    value = ({'data': [1, 2]}, np.arange(5.0))
+    writer.set(('fig', 1), value)
+    got = reader.get(('fig', 1))
+    assert got[0] == value[0] and np.array_equal(got[1], value[1])
+    assert reader.get(('fig', 2)) is None
+    stats = reader.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_shared_caches_evict_least_recently_used(shared):
+    probe = shared()
+    probe.set('probe', array(1))
+    size = probe.stats()['bytes']
+    probe.clear()
+    store = shared(max_bytes=int(2.5 * size))
+    store.set('a', array(1))
+    store.set('b', array(1))
+    if isinstance(store, DiskCache):
+        # File times order eviction; make the order unambiguous.
+        for key, seconds in (('a', 200), ('b', 100)):
+            past = time.time() - seconds
+            os.utime(store._path(key), (past, past))
+    time.sleep(0.01)
+    store.get('a')
+    time.sleep(0.01)
+    store.set('c', array(1))
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+    assert store.stats()['bytes'] <= store.max_bytes
+
+
+def test_shared_caches_skip_oversized_values(shared):
+    store = shared(max_bytes=512)
+    store.set('a', array(1))
+    assert store.get('a') is None and store.stats()['entries'] == 0
+
+
+def test_shared_caches_expire_entries(shared, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    store = shared(ttl=10)
+    store.set('a', 1)
+    now[0] += 9
+    assert store.get('a') == 1
+    now[0] += 2
+    assert store.get('a') is None and store.stats()['entries'] == 0
+
+
+def test_make_cache_reads_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('CHAOS_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('CHAOS_CACHE_TTL', '30')
+    monkeypatch.setenv('CHAOS_CACHE_BACKEND', 'sqlite')
+    sqlite = make_cache('tiles', max_bytes=1024)
+    assert isinstance(sqlite, SQLiteCache) and sqlite.ttl == 30
+    assert sqlite.path == os.path.join(str(tmp_path), 'cache.sqlite')
+    disk = make_cache('tiles', max_bytes=1024, backend='disk', ttl=5)
+    assert isinstance(disk, DiskCache) and disk.ttl == 5
+    assert isinstance(make_cache('tiles', 1024, backend='memory'), LRUCache)
+    with pytest.raises(ValueError):
+        make_cache('tiles', 1024, backend='redis')
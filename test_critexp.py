@@ -0,0 +1,50 @@
+"""Similarity-dimension solver: sum_i w_i r_i^d = 1 for any number of maps.
+
+    python -m pytest -q test_critexp.py
+"""
+import numpy as np
+import pytest
+
+from critexp import similarity_dimension, solve_for_d
+
+
+@pytest.mark.parametrize('r', [0.1, 0.5, 0.9])
+def test_equal_ratios(r):
+    assert solve_for_d(r, r, r) == pytest.approx(np.log(3) / -np.log(r), rel=1e-12)
+
+
+def test_solutions_above_two():
+    d = solve_for_d(0.9, 0.9, 0.9)
+    assert d > 2 and d == pytest.approx(10.427, abs=1e-3)
+    assert 3 * 0.9**d == pytest.approx(1, rel=1e-12)
+
+
+@pytest.mark.parametrize('ratios', [(1, 0.5, 0.5), (0.5, 1, 0.3), (1, 1, 1)])
+def test_a_ratio_of_one_has_no_finite_solution(ratios):
+    assert solve_for_d(*ratios) == np.inf
+
+
+@pytest.mark.parametrize('ratios', [(0, 0.5, 0.5), (0.5, 1.2, 0.5), (-0.1, 0.5, 0.5)])
+def test_ratios_outside_range_raise(ratios):
+    with pytest.raises(ValueError):
+        solve_for_d(*ratios)
+
+
+def test_batch_matches_one_set_at_a_time():
+    ratios = np.random.default_rng(0).uniform(0.05, 0.95, (200, 3))
+    batch = similarity_dimension(ratios)
+    assert batch.shape == (200,)
+    np.testing.assert_allclose(batch, [solve_for_d(*r) for r in ratios.tolist()], rtol=1e-12)
+    np.testing.assert_allclose((ratios ** batch[:, None]).sum(axis=1), 1, rtol=1e-10)
+
+
+def test_any_number_of_maps():
+    assert similarity_dimension([1 / 3] * 8) == pytest.approx(np.log(8) / np.log(3), rel=1e-12)
+    assert similarity_dimension([0.5]) == 0
+
+
+def test_weights_give_negative_solutions():
+    # With w_i = p_i^q and q > 1 the solution -tau(q) is negative.
+    p = np.array([0.2, 0.3, 0.5])
+    d = similarity_dimension([0.5, 0.5, 0.5], p**2)
+    assert d < 0 and (p**2 * 0.5**d).sum() == pytest.approx(1, rel=1e-12)
@@ -0,0 +1,95 @@
+"""Engines must agree: box counts across box-counting engines, and trajectories
+across chaos-game engines and chunkings (equal up to rounding of the scan).
+
+    python -m pytest -q test_engines.py
+"""
+import numpy as np
+import pytest
+
+import fracdim
+from fracdim import BoxCounter, box_counting, box_masses, dyadic_box_sizes, fractal_dimension
+from ifs import (ENGINES, barnsley_fern, chaos_game, iter_chaos_game, sierpinski_simplex,
+                 sierpinski_triangle)
+
+SYSTEMS = {
+    'triangle': sierpinski_triangle(0.2, 0.5, 0.3, 0.7, 0.45),
+    'fern': barnsley_fern(),
+    'pyramid': sierpinski_simplex(3, 0.5),
+}
+
+
+@pytest.fixture(scope='module', params=sorted(SYSTEMS))
+def points(request):
+    return chaos_game(SYSTEMS[request.param], 20000, seed=1)
+
+
+@pytest.mark.parametrize('engine', sorted(fracdim.ENGINES))
+def test_box_counting_engines_agree(points, engine):
+    box_sizes = dyadic_box_sizes(2.0**-10, 11) if engine == 'dyadic' else np.logspace(-3, 0, 12)
+    expected = [int(m.sum()) for _, m in box_masses(points, box_sizes)]
+    assert box_counting(points, box_sizes, engine=engine) == expected
+
+
+@pytest.mark.parametrize('bounds', [False, True])
+def test_box_counter_matches_box_masses(points, bounds):
+    box_sizes = np.logspace(-3, 0, 12)
+    box_bounds = (points.min(axis=0), points.max(axis=0)) if bounds else None
+    counter = BoxCounter(box_sizes, bounds=box_bounds)
+    for chunk in np.array_split(points, 7):
+        counter.add(chunk)
+    masses = box_masses(points, box_sizes)
+    assert counter.counts() == [int(m.sum()) for _, m in masses]
+    assert counter.singletons() == [int(m[c == 1].sum()) for c, m in masses]
+    assert counter.dimension() == pytest.approx(fractal_dimension(points, box_sizes, bootstrap=0))
+
+
+@pytest.mark.parametrize('engine', ['keys', 'unique', 'bitmap'])
+def test_fractal_dimension_independent_of_engine(points, engine):
+    box_sizes = np.logspace(-3, 0, 12)
+    assert (fractal_dimension(points, box_sizes, engine=engine, bootstrap=0)
+            == fractal_dimension(points, box_sizes, bootstrap=0))
+
+
+def test_box_counter_in_five_dimensions():
+    points = chaos_game(sierpinski_simplex(5, 0.5), 20000, seed=1)
+    # The first batch fits int64 keys at every scale; the rest do not, so
+    # the fine scales switch to rows part way through.
+    near = points.max(axis=1) < 0.2
+    counter = BoxCounter()
+    counter.add(points[near])
+    counter.add(points[~near])
+    masses = box_masses(points, counter.box_sizes)
+    assert counter.counts() == [int(m.sum()) for _, m in masses]
+    assert counter.singletons() == [int(m[c == 1].sum()) for c, m in masses]
+    assert 'rows' in {scale['kind'] for scale in counter.memory_report()}
+
+
+@pytest.mark.parametrize('engine', ['keys', 'unique', 'dyadic'])
+def test_box_masses_independent_of_engine(points, engine):
+    box_sizes = dyadic_box_sizes(2.0**-10, 11)
+    for (c, m), (c_auto, m_auto) in zip(box_masses(points, box_sizes, engine),
+                                        box_masses(points, box_sizes)):
+        np.testing.assert_array_equal(c, c_auto)
+        np.testing.assert_array_equal(m, m_auto)
+
+
+def test_single_box_size_has_no_interval(points):
+    with np.errstate(invalid='ignore'):
+        fd = fractal_dimension(points, [0.01], bootstrap=50)
+    assert fd.num_scales == 1 and np.isnan(fd.low) and np.isnan(fd.high)
+
+
+@pytest.mark.parametrize('name', sorted(SYSTEMS))
+def test_loop_and_vectorized_trajectories_agree(name):
+    runs = [chaos_game(SYSTEMS[name], 3000, engine=engine, seed=7) for engine in sorted(ENGINES)]
+    np.testing.assert_allclose(runs[0], runs[1], rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', sorted(SYSTEMS))
+def test_chunked_and_whole_runs_agree(name):
+    ifs = SYSTEMS[name]
+    whole = chaos_game(ifs, 10000, seed=3)
+    chunked = chaos_game(ifs, 10000, seed=3, chunk_size=777)
+    streamed = np.concatenate(list(iter_chaos_game(ifs, 10000, chunk_size=1000, seed=3)))
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(streamed, whole, rtol=0, atol=1e-12)
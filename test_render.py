@@ -0,0 +1,55 @@
+"""encode_axis: typed coordinate arrays and uint16 quantisation.
+
+    python -m pytest -q test_render.py
+"""
+import numpy as np
+import pytest
+
+from render import EXTENT, PRECISIONS, encode_axis
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).uniform(0, 1, 5000)
+
+
+@pytest.mark.parametrize('precision, dtype', [('float64', np.float64), ('float32', np.float32),
+                                              ('uint16', np.uint16)])
+def test_dtypes(values, precision, dtype):
+    encoded, _ = encode_axis(values, EXTENT[0], precision)
+    assert encoded.dtype == dtype and len(encoded) == len(values)
+
+
+def test_uint16_quantisation_error_is_half_a_level(values):
+    lo, hi = EXTENT[0]
+    encoded, axis = encode_axis(values, (lo, hi), 'uint16')
+    step = (hi - lo) / 65535
+    decoded = lo + encoded * step
+    assert np.abs(decoded - values).max() <= step / 2 * (1 + 1e-9)
+    assert axis['range'] == pytest.approx([0, 65535])
+
+
+def test_uint16_ticks_label_original_coordinates(values):
+    lo, hi = EXTENT[0]
+    _, axis = encode_axis(values, (lo, hi), 'uint16', nticks=5)
+    step = (hi - lo) / 65535
+    labels = [float(t) for t in axis['ticktext']]
+    np.testing.assert_allclose([lo + v * step for v in axis['tickvals']], labels, atol=0.005)
+
+
+def test_uint16_covers_values_outside_the_view():
+    values = np.array([-1.0, 0.5, 3.0])
+    encoded, axis = encode_axis(values, EXTENT[0], 'uint16')
+    assert encoded.min() == 0 and encoded.max() == 65535
+    assert 0 < axis['range'][0] < axis['range'][1] < 65535
+
+
+def test_uint16_constant_values():
+    encoded, _ = encode_axis(np.full(4, 0.5), (0.5, 0.5), 'uint16')
+    assert (encoded == 0).all()
+
+
+def test_unknown_precision_raises(values):
+    assert 'float16' not in PRECISIONS
+    with pytest.raises(ValueError):
+        encode_axis(values, EXTENT[0], 'float16')
@@ -0,0 +1,69 @@
+"""PointStore: memory-mapped point clouds with least-recently-used eviction.
+
+    python -m pytest -q test_store.py
+"""
+import os
+
+import numpy as np
+
+from store import PointStore
+
+
+def cloud(n, seed=0):
+    return np.random.default_rng(seed).random((n, 2))
+
+
+def age(store, key, seconds):
+    """Move an entry's last use back by seconds."""
+    path = store._path(key) + '.npy'
+    mtime = os.stat(path).st_mtime - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_round_trip_is_a_read_only_memmap(tmp_path):
+    store = PointStore(str(tmp_path))
+    points = cloud(1000)
+    store.put(('run', 1), points, {'fd': 1.58})
+    stored, meta = store.get(('run', 1))
+    assert isinstance(stored, np.memmap) and not stored.flags.writeable
+    np.testing.assert_array_equal(stored, points)
+    assert meta == {'fd': 1.58}
+    assert store.get(('run', 2)) is None
+
+
+def test_evicts_least_recently_read_entries(tmp_path):
+    points = cloud(1000)
+    store = PointStore(str(tmp_path))
+    store.put(0, points, {})
+    store.put(1, points, {})
+    age(store, 0, 200)
+    age(store, 1, 100)
+    # Reading entry 0 leaves entry 1 the least recently used.
+    store.get(0)
+    store.quota_bytes = 2.5 * store.entries()[0][1]
+    store.put(2, points, {})
+    assert store.get(1) is None
+    assert store.get(0) is not None and store.get(2) is not None
+    assert sum(size for _, size, _ in store.entries()) <= store.quota_bytes
+    # The sidecar goes with its array.
+    assert not os.path.exists(store._path(1) + '.json')
+
+
+def test_torn_entries_read_as_missing(tmp_path):
+    store = PointStore(str(tmp_path))
+    store.put('a', cloud(10), {})
+    os.unlink(store._path('a') + '.npy')
+    assert store.get('a') is None
+
+
+def test_seeded_runs_are_served_from_the_store(tmp_path, monkeypatch):
+    from chaos_game import chaos_game_triangle, result_cache
+    monkeypatch.setenv('CHAOS_STORE_DIR', str(tmp_path))
+    result_cache.clear()
+    points, fd = chaos_game_triangle(5000, seed=11, indexed=False)
+    result_cache.clear()
+    stored, stored_fd = chaos_game_triangle(5000, seed=11, indexed=False)
+    result_cache.clear()
+    assert isinstance(stored, np.memmap)
+    np.testing.assert_array_equal(stored, points)
+    assert stored_fd == fd and stored_fd.low == fd.low
@@ -0,0 +1,58 @@
+"""Parameter sweeps: grids, resuming and recovery from an interrupted write.
+
+    python -m pytest -q test_sweep.py
+"""
+import csv
+
+from sweep import COLUMNS, completed_indices, grid_cells, parse_values, run_sweep
+
+GRID = {'r1': [0.4, 0.5, 0.6], 'r2': [0.45, 0.55]}
+NUM_POINTS = 2000
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return sorted(csv.DictReader(f), key=lambda row: int(row['index']))
+
+
+def test_parse_values():
+    assert parse_values('0:1:3') == [0.0, 0.5, 1.0]
+    assert parse_values('0.2,0.4') == [0.2, 0.4]
+
+
+def test_grid_skips_cells_with_weights_over_one():
+    cells = grid_cells({'p1': [0.2, 0.6], 'p2': [0.3, 0.5]})
+    assert [(c['p1'], c['p2']) for c in cells] == [(0.2, 0.3), (0.2, 0.5), (0.6, 0.3)]
+
+
+def test_completed_indices_truncates_a_partial_line(tmp_path):
+    out = tmp_path / 'sweep.csv'
+    run_sweep(GRID, NUM_POINTS, str(out), workers=1)
+    whole = out.read_bytes()
+    out.write_bytes(whole[:-10])
+    cells = grid_cells(GRID)
+    assert completed_indices(str(out), cells, NUM_POINTS) == set(range(len(cells) - 1))
+    assert out.read_bytes().endswith(b'\n')
+
+
+def test_rows_of_another_grid_are_not_progress(tmp_path):
+    out = tmp_path / 'sweep.csv'
+    run_sweep(GRID, NUM_POINTS, str(out), workers=1)
+    assert completed_indices(str(out), grid_cells(GRID), NUM_POINTS + 1) == set()
+    assert completed_indices(str(out), grid_cells({'r1': [0.3, 0.5]}), NUM_POINTS) == set()
+
+
+def test_resume_computes_only_missing_cells(tmp_path):
+    fresh, resumed = tmp_path / 'fresh.csv', tmp_path / 'resumed.csv'
+    assert run_sweep(GRID, NUM_POINTS, str(fresh), workers=1) == 6
+    # Interrupt after three complete rows and part of the fourth.
+    lines = fresh.read_bytes().splitlines(keepends=True)
+    resumed.write_bytes(b''.join(lines[:4]) + lines[4][:12])
+    assert run_sweep(GRID, NUM_POINTS, str(resumed), workers=1) == 3
+    assert run_sweep(GRID, NUM_POINTS, str(resumed), workers=1) == 0
+    rows = read_rows(resumed)
+    assert [int(row['index']) for row in rows] == list(range(6))
+    # Seeds are per cell, so a resumed sweep gives the same results.
+    results = [k for k in COLUMNS if not k.endswith('_seconds')]
+    for row, expected in zip(rows, read_rows(fresh)):
+        assert [row[k] for k in results] == [expected[k] for k in results]
@@ -0,0 +1,153 @@
+import numpy as np
+
+from cache import make_cache
+from chaos_game import chaos_game_triangle, triangle_maps
+from render import EXTENT, counts_figure, histogram
+
+# Pixels along each side of a rendered tile.
+TILE_PIXELS = 256
+
+# Points generated per tile, and size of the attractor sample they are mapped from.
+TILE_POINTS = 200000
+BASE_POINTS = 200000
+
+# Limits on the address tree walked for one tile.
+MAX_DEPTH = 48
+MAX_CYLINDERS = 4096
+
+# Deepest zoom level; tiles there are 2**-MAX_ZOOM of the full view.
+MAX_ZOOM = 40
+
+# Rendered tiles, keyed by (p1, p2, r1, r2, r3, seed, zoom, tx, ty).
+tile_cache = make_cache('tiles', max_bytes=128 * 2**20)
+
+
+def cylinders(matrices, offsets, probabilities, hull, window, max_size,
+              max_depth=MAX_DEPTH, max_count=MAX_CYLINDERS):
+    """Composite maps f_w = f_w1 o ... o f_wk over IFS addresses w meeting window.
+
+    Walks the address tree breadth first.  A cylinder (the image of hull
+    under f_w) is dropped when its bounding box misses window and kept once
+    it is at most max_size across; larger ones are split into their
+    children.  Returns (A, b, mass) with f_w(x) = A @ x + b and mass the
+    product of the probabilities along w.
+    """
+    (x0, x1), (y0, y1) = window
+    d = matrices.shape[1]
+    A = np.eye(d)[None]
+    b = np.zeros((1, d))
+    mass = np.ones(1)
+    kept = []
+    for depth in range(max_depth + 1):
+        corners = A @ hull.T + b[:, :, None]
+        lo, hi = corners.min(axis=2), corners.max(axis=2)
+        meets = (hi[:, 0] >= x0) & (lo[:, 0] <= x1) & (hi[:, 1] >= y0) & (lo[:, 1] <= y1)
+        small = (hi - lo).max(axis=1) <= max_size
+        last = depth == max_depth or len(A) * len(matrices) > max_count
+        done = meets & (small | last)
+        kept.append((A[done], b[done], mass[done]))
+        split = meets & ~done
+        if not split.any():
+            break
+        A, b, mass = A[split], b[split], mass[split]
+        # Children w + i: f_w o f_i has matrix A_w A_i and offset A_w b_i + b_w.
+        b = (b[:, None] + (A[:, None] @ offsets[None, :, :, None])[..., 0]).reshape(-1, d)
+        A = (A[:, None] @ matrices[None]).reshape(-1, d, d)
+        mass = (mass[:, None] * probabilities[None]).reshape(-1)
+        positive = mass > 0
+        A, b, mass = A[positive], b[positive], mass[positive]
+    return (np.concatenate([k[0] for k in kept]),
+            np.concatenate([k[1] for k in kept]),
+            np.concatenate([k[2] for k in kept]))
+
+
+def sample_cylinders(base, A, b, mass, num_points, rng):
+    """Map attractor samples into the cylinders in proportion to their mass.
+
+    Returns the points and the measure each one represents, so images built
+    from different windows share one scale.
+    """
+    total = mass.sum()
+    if total <= 0:
+        return np.empty((0, base.shape[1])), 0.0
+    counts = rng.multinomial(num_points, mass / total)
+    points = np.empty((num_points, base.shape[1]))
+    start = 0
+    for A_w, b_w, n in zip(A, b, counts):
+        sample = base[rng.integers(0, len(base), n)]
+        points[start:start + n] = sample @ A_w.T + b_w
+        start += n
+    return points, total / num_points
+
+
+def tile_extent(zoom, tx, ty):
+    """((x0, x1), (y0, y1)) of tile (tx, ty) at a zoom level."""
+    (ex0, ex1), (ey0, ey1) = EXTENT
+    wx, wy = (ex1 - ex0) / 2**zoom, (ey1 - ey0) / 2**zoom
+    return (ex0 + tx * wx, ex0 + (tx + 1) * wx), (ey0 + ty * wy, ey0 + (ty + 1) * wy)
+
+
+def _contractive(params):
+    return all(0 < params[r] < 1 for r in ('r1', 'r2', 'r3'))
+
+
+def tile_image(params, zoom, tx, ty):
+    """Measure per pixel of one tile, as a (TILE_PIXELS, TILE_PIXELS) float32 array.
+
+    Points are generated only in cylinders meeting the tile, so the detail
+    at deep zooms matches that of the full view.  Results are cached.
+    """
+    key = tuple(float(params[k]) for k in ('p1', 'p2', 'r1', 'r2', 'r3')) + (
+        params.get('seed'), zoom, tx, ty)
+    image = tile_cache.get(key)
+    if image is not None:
+        return image
+
+    extent = tile_extent(zoom, tx, ty)
+    seed = params.get('seed')
+    base, _ = chaos_game_triangle(BASE_POINTS, params['p1'], params['p2'],
+                                  params['r1'], params['r2'], params['r3'], seed=seed,
+                                  indexed=False)
+    if _contractive(params):
+        matrices, offsets, probabilities, hull = triangle_maps(
+            params['p1'], params['p2'], params['r1'], params['r2'], params['r3'])
+        max_size = extent[0][1] - extent[0][0]
+        A, b, mass = cylinders(matrices, offsets, probabilities, hull, extent, max_size)
+    else:
+        # Without a contraction there is no address structure to exploit.
+        A, b, mass = np.eye(2)[None], np.zeros((1, 2)), np.ones(1)
+    rng = np.random.default_rng(None if seed is None else [seed, zoom, tx & 0xffffffff, ty & 0xffffffff])
+    points, weight = sample_cylinders(base, A, b, mass, TILE_POINTS, rng)
+    image = (histogram(points[:, 0], points[:, 1], TILE_PIXELS, extent) * weight).astype(np.float32)
+    tile_cache.set(key, image)
+    return image
+
+
+def zoom_figure(params, window, scale='log'):
+    """Density figure of the attractor over window, assembled from cached tiles.
+
+    window is ((x0, x1), (y0, y1)); the zoom level is the one whose tiles
+    are about the size of the window, so the image is close to screen
+    resolution at any depth.  The mosaic covers the part of the window
+    inside EXTENT, so it is at most a few tiles a side at any zoom.
+    """
+    (x0, x1), (y0, y1) = window
+    (ex0, ex1), (ey0, ey1) = EXTENT
+    width = max(x1 - x0, y1 - y0, 1e-300)
+    zoom = int(np.clip(np.floor(np.log2((ex1 - ex0) / width)), 0, MAX_ZOOM))
+    wx, wy = (ex1 - ex0) / 2**zoom, (ey1 - ey0) / 2**zoom
+    # Only tiles inside EXTENT are drawn: zooming out or panning away from
+    # the attractor shows blank margins rather than a mosaic of empty tiles.
+    last = 2**zoom - 1
+    tx0, tx1 = (int(np.clip(np.floor((x - ex0) / wx), 0, last)) for x in (x0, x1))
+    ty0, ty1 = (int(np.clip(np.floor((y - ey0) / wy), 0, last)) for y in (y0, y1))
+    mosaic = np.zeros(((ty1 - ty0 + 1) * TILE_PIXELS, (tx1 - tx0 + 1) * TILE_PIXELS), dtype=np.float32)
+    for ty in range(ty0, ty1 + 1):
+        for tx in range(tx0, tx1 + 1):
+            row, col = (ty - ty0) * TILE_PIXELS, (tx - tx0) * TILE_PIXELS
+            mosaic[row:row + TILE_PIXELS, col:col + TILE_PIXELS] = tile_image(params, zoom, tx, ty)
+    extent = ((tile_extent(zoom, tx0, ty0)[0][0], tile_extent(zoom, tx1, ty1)[0][1]),
+              (tile_extent(zoom, tx0, ty0)[1][0], tile_extent(zoom, tx1, ty1)[1][1]))
+    fig = counts_figure(mosaic, extent, scale)
+    fig.update_layout(xaxis=dict(range=[x0, x1]), yaxis=dict(range=[y0, y1]))
+    return fig